@@ -0,0 +1,215 @@
+import argparse
+import sys
+import time
+from itertools import combinations, permutations
+
+import numpy as np
+
+from PokerCards import parse_cards, cards_to_str
+from PokerEval import (EVALUATOR_BACKENDS, HAVE_NUMBA, HandState, describe_score, get_evaluator,
+                       get_batch_evaluator)
+from Poker2 import PokerGame
+
+
+
+# Differential fuzz check and throughput report for the hand evaluators.
+#
+#   python EvaluatorFuzz.py                   # 1M hands per size, every backend
+#   python EvaluatorFuzz.py --hands 5000000 --seed 7 --backends lookup
+#
+# Every backend promises the same packed scores as the reference, PokerGame.evaluate_hand
+# (the plain 5-card evaluator), taken as the max over every 5-card subset for 6 and 7 cards.
+# The reference is slow, so it checks the first --reference-hands hands of each size and the
+# backends check each other on the rest. Exits with status 1 on the first mismatch.
+
+
+def reference_score(cards, evaluate_hand=PokerGame.evaluate_hand):
+    return max(evaluate_hand(None, list(five)) for five in combinations(cards, 5))
+
+
+def single_backends():
+    """name -> function scoring one hand."""
+    backends = {}
+    for name in EVALUATOR_BACKENDS:
+        if name == "numba" and not HAVE_NUMBA:
+            continue  # falls back to the python evaluator, nothing new to check
+        backends[name] = get_evaluator(name)
+    backends["handstate"] = lambda cards: HandState(cards).score()
+    return backends
+
+
+def batch_backends():
+    """name -> function scoring an (N, 5-7) array."""
+    return {f"{name}-batch": get_batch_evaluator(name) for name in EVALUATOR_BACKENDS
+            if name != "numba" or HAVE_NUMBA}
+
+
+def random_hands(rng, n, size):
+    return np.argsort(rng.random((n, 52)), axis=1)[:, :size]
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Hand-picked spots: wheels, royal flushes and kicker ties
+
+
+def special_hands(rng):
+    """Lists of 5-7 card hands that are easy to get wrong."""
+    hands = []
+
+    # Every suit pattern of A-2-3-4-5 (1024 wheels, 4 of them straight flushes), alone and with extra cards
+    wheel_ranks = [12, 0, 1, 2, 3]
+    for suits in np.ndindex(4, 4, 4, 4, 4):
+        wheel = [r * 4 + s for r, s in zip(wheel_ranks, suits)]
+        hands.append(wheel)
+        rest = [c for c in rng.permutation(52).tolist() if c not in wheel]
+        hands.append(wheel + rest[:1])
+        hands.append(wheel + rest[:2])
+
+    # Royal flushes, plus the king-high straight flush just under them
+    for suit in range(4):
+        for top in (12, 11):
+            flush = [r * 4 + suit for r in range(top - 4, top + 1)]
+            rest = [c for c in rng.permutation(52).tolist() if c not in flush]
+            hands += [flush, flush + rest[:1], flush + rest[:2]]
+
+    return hands
+
+
+# (hand a, hand b, expected comparison of a against b: 1, 0 or -1)
+ORDERING_CASES = [
+    ("AS 2D 3H 4C 5S", "2S 3D 4H 5C 6S", -1),               # the wheel is the lowest straight
+    ("AS 2S 3S 4S 5S", "KD KH KC KS 2D", 1),                 # steel wheel beats quads
+    ("AH KH QH JH TH", "KS QS JS TS 9S", 1),                 # royal over king-high straight flush
+    ("AH KH QH JH TH 2C 3D", "AS KS QS JS TS 9S 8S", 0),     # royal vs royal
+    ("AS KD QH 7C 3S 2D 4H", "AD KS QC 7H 3D 2C 4S", 0),     # same ranks, other suits
+    ("AS AD KH QC 9S", "AH AC KD QS 8D", 1),                 # last kicker decides
+    ("KS KD 7H 7C AS", "KH KC 7D 7S QS", 1),                 # two pair kicker
+    ("KS KD 7H 7C 7S", "KH KC KD 2S 2D", -1),                # full house by trips first
+    ("2S 2D 2H 2C AS", "2S 2D 2H 2C KS", 1),                 # quads kicker
+    ("2S 2D 2H 2C AS KS QS", "2S 2D 2H 2C AD 3C 4C", 0),     # quads: only one kicker plays
+    ("9S 8D 7H 6C 5S 4D 3H", "9D 8S 7C 6H 5D 2S 2H", 0),     # straight: lower cards don't play
+    ("AS KS QS JS 9S 8S 7S", "AD KD QD JD 9D 2C 3C", 0),     # flush: only the top five play
+    ("AS KS QS JS 9S 8D 7H", "AD KD QD JD 8D 2C 3C", 1),     # flush fifth card
+]
+
+
+#-----------------------------------------------------------------------------------------------------------------
+
+
+def fail(backend, cards, got, expected):
+    print(f"MISMATCH {backend}: {cards_to_str(cards)} -> {describe_score(int(got))}, "
+          f"expected {describe_score(int(expected))}")
+    sys.exit(1)
+
+
+def check_ordering(backends):
+    for a_text, b_text, expected in ORDERING_CASES:
+        a, b = parse_cards(a_text), parse_cards(b_text)
+        ref = (reference_score(a) > reference_score(b)) - (reference_score(a) < reference_score(b))
+        if ref != expected:
+            print(f"Reference disagrees with the expected result: {a_text} vs {b_text}")
+            sys.exit(1)
+        for name, evaluate in backends.items():
+            score_a, score_b = int(evaluate(a)), int(evaluate(b))
+            if (score_a > score_b) - (score_a < score_b) != expected:
+                print(f"ORDER {name}: {a_text} ({describe_score(score_a)}) vs "
+                      f"{b_text} ({describe_score(score_b)}), expected {expected}")
+                sys.exit(1)
+    print(f"ordering cases: {len(ORDERING_CASES)} ok")
+
+
+def check_hands(label, hands, singles, batches, reference_count):
+    """Checks every backend on a list of hands. The reference scores the first reference_count."""
+    expected = [reference_score(cards) for cards in hands[:reference_count]]
+    for name, evaluate in singles.items():
+        for cards, score in zip(hands, expected):
+            got = evaluate(cards)
+            if got != score:
+                fail(name, cards, got, score)
+    for name, evaluate in batches.items():
+        by_size = {}
+        for i, cards in enumerate(hands[:reference_count]):
+            by_size.setdefault(len(cards), []).append(i)
+        for idx in by_size.values():
+            got = evaluate(np.array([hands[i] for i in idx]))
+            for i, score in zip(idx, got.tolist()):
+                if score != expected[i]:
+                    fail(name, hands[i], score, expected[i])
+    print(f"{label}: {min(len(hands), reference_count)} hands ok against the reference")
+
+
+def check_suit_relabelling(hands, singles):
+    """Relabelling suits never changes a score, so hands that differ only in suits must tie."""
+    for perm in list(permutations(range(4)))[1:]:
+        for cards in hands:
+            moved = [(c & ~3) | perm[c & 3] for c in cards]
+            for name, evaluate in singles.items():
+                if evaluate(moved) != evaluate(cards):
+                    fail(name, moved, evaluate(moved), evaluate(cards))
+    print(f"suit relabelling: {len(hands)} hands x 23 relabellings ok")
+
+
+def fuzz(size, args, rng, singles, batches, baseline):
+    hands = random_hands(rng, args.hands, size)
+    hand_lists = hands[:args.single_hands].tolist()
+
+    # Reference on the first slice, for the single-hand backends and the batch ones
+    check_hands(f"{size} cards", hand_lists[:args.reference_hands], singles, batches, args.reference_hands)
+
+    # Everything else against the baseline batch backend, which was just checked against the reference
+    expected = batches[baseline](hands)
+    for name, evaluate in batches.items():
+        start = time.perf_counter()
+        got = evaluate(hands)
+        elapsed = time.perf_counter() - start
+        bad = np.flatnonzero(got != expected)
+        if len(bad):
+            fail(name, hands[bad[0]].tolist(), got[bad[0]], expected[bad[0]])
+        print(f"  {name:>16}: {len(hands):>9} hands  {len(hands) / elapsed:>12,.0f} hands/s")
+
+    for name, evaluate in singles.items():
+        start = time.perf_counter()
+        got = [evaluate(cards) for cards in hand_lists]
+        elapsed = time.perf_counter() - start
+        bad = np.flatnonzero(np.array(got) != expected[:len(hand_lists)])
+        if len(bad):
+            fail(name, hand_lists[bad[0]], got[bad[0]], expected[bad[0]])
+        print(f"  {name:>16}: {len(hand_lists):>9} hands  {len(hand_lists) / elapsed:>12,.0f} hands/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuzz every hand evaluator backend against the reference.")
+    parser.add_argument("--hands", type=int, default=1000000, help="random hands per size for the batch backends")
+    parser.add_argument("--single-hands", type=int, default=100000,
+                        help="of those, how many the one-hand-at-a-time backends score")
+    parser.add_argument("--reference-hands", type=int, default=20000,
+                        help="of those, how many the slow reference scores")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="*", help="only these (default: all available)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    singles = single_backends()
+    batches = batch_backends()
+    if args.backends:
+        singles = {name: f for name, f in singles.items() if name in args.backends}
+        batches = {name: f for name, f in batches.items() if name.replace("-batch", "") in args.backends}
+    baseline = next(iter(batches), None)
+    print(f"seed {args.seed}, backends: {', '.join(list(singles) + list(batches))}")
+    if baseline is None:
+        print("Need at least one batch backend")
+        sys.exit(1)
+
+    check_ordering({**singles, **{name: (lambda f: lambda cards: f(np.array([cards]))[0])(f)
+                                  for name, f in batches.items()}})
+    specials = special_hands(rng)
+    check_hands("wheels and royals", specials, singles, batches, len(specials))
+    check_suit_relabelling(random_hands(rng, 500, 7).tolist(), singles)
+
+    for size in (5, 6, 7):
+        fuzz(size, args, rng, singles, batches, baseline)
+    print("all backends agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import random
-from itertools import combinations
 import json
 import os
 import matplotlib.pyplot as plt
 
+from PokerCards import str_to_card
+from PokerEval import HandState
+
 
 # Define card ranks and suits
 RANKS = "23456789TJQKA"
@@ -216,6 +218,7 @@ class PokerGame:
 
         self.ante_amount = 5
         self.community_cards = []  # List to hold the community cards (Flop, Turn, River)
+        self.hand_states = {}  # Each player's best hand so far, updated as cards are dealt
         self.pot = 0  # Initialize the pot amount
         self.balances = {player: 1000 for player in self.players if player != "AI"}  # Each player starts with 1000 chips
         self.current_bets = {player: 0 for player in self.players}  # Track each player's bet in a round
@@ -230,34 +233,46 @@ class PokerGame:
             self.players[player] = [self.deck.pop(), self.deck.pop()]
             if player == "AI":
                 self.ai_player.hand = self.players[player]
+            self.hand_states[player] = HandState(str_to_card(card) for card in self.players[player])
 
             print(f"{player}'s Hole Cards: {self.players[player]}")  # Output the player's hole cards
 
     def deal_flop(self):
         """Deals three community cards (the Flop)."""
-        self.community_cards.extend([self.deck.pop() for _ in range(3)])  # Draw three cards
+        for _ in range(3):
+            self.add_community_card(self.deck.pop())  # Draw three cards
         print(f"Flop: {self.community_cards}")
         self.betting_stage = 1
         self.betting_round()
 
     def deal_turn(self):
         """Deals   fourth community card (the Turn)."""
-        self.community_cards.append(self.deck.pop())  # Draw one card
+        self.add_community_card(self.deck.pop())  # Draw one card
         print(f"Turn: {self.community_cards}")
         self.betting_stage = 2
         self.betting_round()
 
     def deal_river(self):
         """Deals the fifth community card (the River)."""
-        self.community_cards.append(self.deck.pop())  # Draw one more card
+        self.add_community_card(self.deck.pop())  # Draw one more card
         print(f"River: {self.community_cards}")
         self.betting_stage = 3
         self.betting_round()
 
-    def get_best_hand(self, player):
-        """Finds the best five-card hand for a player."""
-        all_cards = self.players[player] + self.community_cards  # Combine hole cards and community cards
-        return max(combinations(all_cards, 5), key=self.evaluate_hand)  # Choose the best 5-card combination
+    def add_community_card(self, card):
+        """Adds a card to the board and to every player's hand state."""
+        self.community_cards.append(card)
+        card = str_to_card(card)
+        for state in self.hand_states.values():
+            state.add(card)
+
+    def get_best_hand_score(self, player):
+        """Packed score of a player's best five-card hand so far (see PokerEval.decode_score)."""
+        return self.hand_states[player].score()
+
+    def get_hand_strength(self, player):
+        """Hand category 0-8 like evaluate_hand (a royal flush counts as a straight flush)."""
+        return min(self.get_best_hand_score(player) >> 20, 8)
 
     def evaluate_hand(self, hand):
         """Evaluates the strength of a hand based on poker rules."""
@@ -300,8 +315,7 @@ class PokerGame:
         if len(self.players) == 1:
             winner = list(self.players.keys())[0]
         else:
-            best_hands = {player: self.get_best_hand(player) for player in self.players}
-            best_scores = {player: self.evaluate_hand(hand) for player, hand in best_hands.items()}
+            best_scores = {player: self.get_best_hand_score(player) for player in self.players}
             winner = max(best_scores, key=best_scores.get)
         
         print(f"Winner: {winner}, Pot: {self.pot}")
@@ -343,7 +357,7 @@ class PokerGame:
                 if player not in self.players:
                     continue
                 
-                hand_strength = self.evaluate_hand(self.get_best_hand(player))
+                hand_strength = self.get_hand_strength(player)
                 win_probability = (hand_strength + 1) / 9  # Normalize probability
                 if player == "AI":
                     self.ai_player.update_win_probability(win_probability)
@@ -432,6 +446,7 @@ class PokerGame:
             self.players["AI"] = self.ai_player
         self.current_bets = {player: 0 for player in self.players}
         self.community_cards = []
+        self.hand_states = {}
         self.pot = 0
         self.current_bets = {player: 0 for player in self.players}
         self.betting_stage = 0
@@ -1,24 +1,22 @@
 import random
-from itertools import combinations
-import json
 import os
 import matplotlib.pyplot as plt
 import sys
 import copy
 import time
+import numpy as np
 
 
+from PokerCards import BitDeck
+from PokerEval import evaluate_hand, get_batch_evaluator, HandState, split_pot, DEFAULT_EVALUATOR
+from PokerEquity import estimate_equity, count_deals, EquityEstimate, EquityPool, EquitySession, DEFAULT_EXACT_LIMIT
+from PokerEquity import load_preflop_table, preflop_equity, MAX_PREFLOP_OPPONENTS
+from PokerRange import HandRange, range_equity
+from PokerEquityCache import EquityCache, DEFAULT_CACHE_PATH
+from PokerQTable import QTable, ACTIONS, state_index
+from PokerCheckpoint import AI_FIELDS, checkpoint_path, write_checkpoint, load_checkpoint, read_json_state
+from PokerCheckpoint import CheckpointManager
 
-# Define card ranks and suits
-RANKS = "23456789TJQKA"
-SUITS = "♠♥♦♣"
-
-
-def create_deck():
-    """Creates a shuffled deck of 52 cards."""
-    deck = [rank + suit for rank in RANKS for suit in SUITS]  # Generate all 52 possible cards
-    random.shuffle(deck)  # Shuffle the deck randomly
-    return deck
 
 def print_progress_bar(current, total, bar_length=40, elapsed=None, eta=None):
     percent = current / total
@@ -41,14 +39,14 @@ def print_progress_bar(current, total, bar_length=40, elapsed=None, eta=None):
 
 
 class PokerAI:
-    def __init__(self, name, balance=1000, save_file="ai_data.json", load=True):
+    def __init__(self, name, balance=1000, save_file="ai_data.ckpt", load=True):
         self.name = name
         self.balance = balance
         self.starting_balance = 0
         self.hand = []
         self.win_probability = 0
         self.history = []
-        self.save_file = save_file
+        self.save_file = checkpoint_path(save_file)  # binary checkpoint, see PokerCheckpoint
 
         self.all_in = False
 
@@ -61,7 +59,9 @@ class PokerAI:
         self.call_threshold = 0.4
 
 
-        self.q_table = {}  # Key: (rounded_probability, stage), Value: dict of action: Q-value
+        self.q_table = QTable()  # (rounded_probability, stage, aggression) -> action -> Q-value, see PokerQTable
+        self.visits = {}  # Same keys, counts of how often each action was updated (for merging tables)
+        self.transitions = None  # set to a list to record (state, action, reward) instead of learning (actors)
         self.learning_rate = 0.1
         self.discount_factor = 0.9
         self.exploration_rate = 0.2  # Chance to try random move
@@ -79,65 +79,50 @@ class PokerAI:
             self.load_ai_state()
 
 
+    @property
+    def q_table(self):
+        return self._q_table
+
+    @q_table.setter
+    def q_table(self, table):
+        # Old {state: {action: value}} dicts (JSON saves, merged tables) become dense tables
+        self._q_table = table if isinstance(table, QTable) else QTable.from_dict(table)
+
     def update_win_probability(self, probability):
         """Update the AI's probability of winning."""
         self.win_probability = probability
         
     def save_ai_state(self):
-        # Convert tuple keys in Q-table to strings
-        q_table_serializable = {
-            str(state): action_values for state, action_values in self.q_table.items()
-        }
-
-
-        ai_data = {
-            "balance": self.balance,
-            "history": self.history,
-            "bluff_chance": self.bluff_chance,
-            "raise_threshold": self.raise_threshold,
-            "call_threshold": self.call_threshold,
-            "aggressive_threshold": self.aggressive_threshold,
-            "cautious_threshold": self.cautious_threshold,
-            "q_table": q_table_serializable
-        }
-
-        with open(self.save_file, "w") as f:
-            json.dump(ai_data, f)
-
+        write_checkpoint(self.save_file, self.q_table, self.visits,
+                         {name: getattr(self, name) for name in AI_FIELDS})
 
 
     def load_ai_state(self):
-        if os.path.exists(self.save_file):
-            try:
-                with open(self.save_file, "r") as f:
-                    ai_data = json.load(f)
-                    self.balance = ai_data.get("balance", 1000)
-                    self.history = ai_data.get("history", [])
-                    self.bluff_chance = ai_data.get("bluff_chance", 0.1)
-                    self.aggressive_threshold = ai_data.get("aggressive_threshold", 0.7)
-                    self.cautious_threshold = ai_data.get("cautious_threshold", 0.4)
-                    self.raise_threshold = ai_data.get("raise_threshold", 0.7)
-                    self.call_threshold = ai_data.get("call_threshold", 0.4)
-
-
-                    # Convert string keys back to tuples
-                    raw_q_table = ai_data.get("q_table", {})
-                    self.q_table = {}
-                    for key_str, actions in raw_q_table.items():
-                        try:
-                            state_tuple = eval(key_str)  # Turns "(1, 2)" → (1, 2)
-                            self.q_table[state_tuple] = actions
-                        except (SyntaxError, NameError):
-                            continue  # skip corrupted entries
-
-
-                    print(f"AI state loaded: Balance={self.balance}")
-            except (json.JSONDecodeError, IOError, SyntaxError):
-                print("Error loading AI state. Starting fresh.")
-                self.__init__(self.name)
-        else:
-            print("No AI save file found. Starting fresh.")
+        # Old JSON saves (AI_1.json next to AI_1.ckpt) are converted the first time they're loaded
+        legacy_file = os.path.splitext(self.save_file)[0] + ".json"
+        try:
+            if os.path.exists(self.save_file):
+                checkpoint = load_checkpoint(self.save_file)
+                q_table, visits, fields = checkpoint.q_table, checkpoint.visits, checkpoint.fields
+            elif os.path.exists(legacy_file):
+                q_table, visits, fields = read_json_state(legacy_file)
+                print(f"Converting {legacy_file} to {self.save_file}")
+            else:
+                print("No AI save file found. Starting fresh.")
+                self.save_ai_state()
+                return
+        except (ValueError, OSError) as e:
+            print(f"Error loading AI state ({e}). Starting fresh.")
+            self.__init__(self.name, save_file=self.save_file, load=False)
+            return
+
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.q_table = q_table
+        self.visits = visits
+        if not os.path.exists(self.save_file):
             self.save_ai_state()
+        print(f"AI state loaded: Balance={self.balance}")
 
 
     def decide_bet(self, highest_bet, min_raise, total_pot, betting_stage):
@@ -150,14 +135,14 @@ class PokerAI:
         )
 
 
-        if state not in self.q_table:
-            self.q_table[state] = {a: 0.0 for a in ["fold", "call", "raise", "bluff"]}
+        index = state_index(state)
+        self.q_table.touch(index)
 
         # Epsilon-greedy choice
         if random.random() < self.exploration_rate:
-            action = random.choice(list(self.q_table[state].keys()))
+            action = random.choice(ACTIONS)
         else:
-            action = max(self.q_table[state], key=self.q_table[state].get)
+            action = ACTIONS[self.q_table.best_action(index)]
 
         self.last_state = state
         self.last_action = action
@@ -204,19 +189,12 @@ class PokerAI:
             #print("No last state/action to update from.")
             return
 
-        if state not in self.q_table:
-            self.q_table[state] = {a: 0.0 for a in ["fold", "call", "raise", "bluff"]}
-
-        current_q = self.q_table[state].get(action, 0.0)
-        max_future_q = max(self.q_table[state].values(), default=0.0)
-
-        # Q-learning update
-        new_q = ((1 - self.learning_rate) * current_q +
-                self.learning_rate * (reward + self.discount_factor * max_future_q))
-
-        self.q_table[state][action] = new_q
-
-        #print(f"Updated Q-value for {state} {action}: {current_q:.3f} → {new_q:.3f} (reward {reward})")
+        if self.transitions is not None:
+            # Acting on a read-only snapshot: the learner applies the update (see PokerTrainer)
+            self.transitions.append((state, action, reward))
+        else:
+            apply_q_update(self.q_table, self.visits, state, action, reward, self.learning_rate,
+                           self.discount_factor)
 
         # Decay exploration rate slightly
         self.exploration_rate = max(0.01, self.exploration_rate * 0.98)
@@ -391,10 +369,19 @@ class BotPlayer:
 
 
 class PokerGame:
-    def __init__(self, num_ai=2, num_bots=1, ante_amount=5):
-        self.deck = []
+    """Self-play table for the AIs and bots.
+
+    `evaluator` ("python", "lookup" or "numba", see PokerEval.get_evaluator) picks the batch
+    scorer behind every equity simulation, which is where nearly all the scoring happens.
+    Showdowns don't use it: each player's HandState already has the best hand by then.
+    """
+
+    def __init__(self, num_ai=2, num_bots=1, ante_amount=5, evaluator=DEFAULT_EVALUATOR,
+                 exact_limit=DEFAULT_EXACT_LIMIT, parallel=False, cache_path=None, load_ai=True, autosave=True):
+        self.deck = BitDeck()
         self.players = {}  # name -> PokerAI instance
         self.community_cards = []
+        self.hand_states = {}  # name -> HandState for the current hand
         self.pot = 0
         self.ante_amount = ante_amount
         self.betting_stage = 0  # 0 = pre-flop, 1 = flop, 2 = turn, 3 = river
@@ -404,11 +391,65 @@ class PokerGame:
         self.num_ai = num_ai
         self.num_bots = num_bots
 
+        # Whether AIs start from their AI_n.ckpt files and write them back as they learn
+        # (training workers turn both off and share Q-tables through PokerTrainer instead).
+        # Saves are batched: every checkpoints.every_hands hands or every_seconds seconds,
+        # at each new generation and on exit, written on a background thread
+        self.load_ai = load_ai
+        self.autosave = autosave
+        self.checkpoints = CheckpointManager() if autosave else None
+
+        # Batch best-hand scorer for the equity simulations, see PokerGame's docstring
+        self.best_hand_scores = get_batch_evaluator(evaluator)
+        self.rng = np.random.default_rng()
+
+        # Enumerate equity exactly when at most this many (board, opponent hands) deals are left
+        self.exact_limit = exact_limit
+
+        # Set target_stderr to sample each decision adaptively instead of a fixed simulation count
+        self.target_stderr = None
+        self.min_samples = 32
+        self.max_samples = 2000
+        self.last_estimate = None  # EquityEstimate behind the most recent win probability
+
+        # (hand, board, num_opponents) -> EquityEstimate, only valid until the next card is dealt
+        self.equity_cache = {}
+
+        # Monte Carlo runouts per decision, and whether a street's seats share one set of runouts
+        self.simulations = 50
+        self.shared_board = True
+        # How runouts are drawn, see PokerEquity.draw_runouts. "disjoint" is a little tighter
+        # than "random" at this many runouts and needs fewer shuffles, so it stays the default
+        self.sampling = "disjoint"
+
+        # Shared runouts drawn on the flop and filtered down on the turn and river (one hand only),
+        # never fewer than `simulations`
+        self.session_simulations = 2000
+        self.equity_session = None
+        self.session_stats = {}  # (board size, "new" / "reused") -> count, see SessionCheck.py
+
+        # Worker processes for big simulation budgets (analysis runs), kept alive between decisions
+        self.equity_pool = EquityPool(evaluator=evaluator) if parallel else None
+
+        # Equity by suit-canonical spot, kept on disk between runs (None = off)
+        self.disk_cache = EquityCache(cache_path) if cache_path else None
+
+        # Precomputed preflop equities by hand class (None if preflop_equity.npy is missing)
+        self.preflop_table = load_preflop_table()
+
+        # Opponent ranges: with use_ranges on, equity is against each live opponent's range
+        # instead of random hands, and a raise narrows the raiser's range to the top raise_range
+        self.use_ranges = False
+        self.raise_range = 0.3
+        self.raise_narrowing = None
+        if self.preflop_table is not None:
+            self.raise_narrowing = HandRange.top(self.raise_range, self.preflop_table)
+        self.player_ranges = {}
 
         # Add AIs
         for i in range(num_ai):
             name = f"AI_{i+1}"
-            ai = PokerAI(name, save_file=f"{name}.json")
+            ai = PokerAI(name, save_file=f"{name}.ckpt", load=load_ai)
             self.players[name] = ai
             self.all_players[name] = ai
 
@@ -426,7 +467,7 @@ class PokerGame:
 
     def reset_game(self):
         """Resets game state for a new hand."""
-        self.deck = create_deck()
+        self.deck = BitDeck()
         self.community_cards = []
         self.pot = 0
         self.betting_stage = 0
@@ -440,19 +481,34 @@ class PokerGame:
 
 
     def deal_hole_cards(self):
+        self.equity_cache.clear()
+        self.equity_session = None
+        self.player_ranges = {name: HandRange() for name in self.players}
         for player in self.players.values():
-            player.hand = [self.deck.pop(), self.deck.pop()]
+            player.hand = [self.deck.draw(), self.deck.draw()]
+
+        # Each player's best hand so far, updated card by card as the board comes out
+        self.hand_states = {name: HandState(player.hand) for name, player in self.players.items()}
+
+    def add_community_card(self, card):
+        self.community_cards.append(card)
+        for state in self.hand_states.values():
+            state.add(card)
 
     def deal_flop(self):
-        self.community_cards += [self.deck.pop() for _ in range(3)]
+        self.equity_cache.clear()
+        for _ in range(3):
+            self.add_community_card(self.deck.draw())
         #print(f"Flop: {self.community_cards}")
 
     def deal_turn(self):
-        self.community_cards.append(self.deck.pop())
+        self.equity_cache.clear()
+        self.add_community_card(self.deck.draw())
         #print(f"Turn: {self.community_cards[-1]}")
 
     def deal_river(self):
-        self.community_cards.append(self.deck.pop())
+        self.equity_cache.clear()
+        self.add_community_card(self.deck.draw())
         #print(f"River: {self.community_cards[-1]}")
 
     def betting_round(self, stage):
@@ -477,6 +533,9 @@ class PokerGame:
 
         #print(f"{first_to_act} starts betting with {forced_bet}")
 
+        num_opponents = len(self.players) - 1
+        if self.shared_board and self.community_cards and not self.use_ranges:
+            self.estimate_table_win_probabilities(rotated_players, num_opponents)
 
         betting_complete = False
         while not betting_complete:
@@ -488,8 +547,11 @@ class PokerGame:
 
                 player = self.players[player_name]
 
-                num_opponents = len(self.players) - 1
-                win_prob = self.estimate_win_probability(player, simulations=50, num_opponents=num_opponents)
+                if self.use_ranges:
+                    opponents = [name for name in rotated_players if name != player_name and name not in folded_players]
+                    win_prob = self.estimate_range_win_probability(player, opponents, simulations=self.simulations)
+                else:
+                    win_prob = self.estimate_win_probability(player, simulations=self.simulations, num_opponents=num_opponents)
                 player.update_win_probability(win_prob)
 
 
@@ -529,6 +591,8 @@ class PokerGame:
 
                 if total_bet > highest_bet:
                     highest_bet = total_bet
+                    if self.use_ranges and self.raise_narrowing is not None:
+                        self.player_ranges[player_name] = self.player_ranges[player_name].narrowed(self.raise_narrowing)
                     betting_complete = False  # someone raised, continue loop
                     if self.is_ai(player_name):
                         if bet == highest_bet and call_amount > 0:
@@ -556,127 +620,122 @@ class PokerGame:
         self.players = {p: self.players[p] for p in self.players if p not in folded_players}
 
     def estimate_win_probability(self, player, simulations=100, num_opponents=1):
-        from random import sample
-        from itertools import combinations
-
-        deck = create_deck()
-        known_cards = player.hand + self.community_cards
-
-        # Remove known cards from the deck
-        for card in known_cards:
-            if card in deck:
-                deck.remove(card)
-
-        wins = 0
-        ties = 0
-
-        for _ in range(simulations):
-            # Clone the deck and shuffle
-            sim_deck = deck[:]
-
-            # Generate missing community cards
-            remaining_community = 5 - len(self.community_cards)
-            sim_community = self.community_cards + [sim_deck.pop() for _ in range(remaining_community)]
-
-            # Get player's full hand
-            player_best = max(combinations(player.hand + sim_community, 5), key=self.evaluate_hand)
-            player_score = self.evaluate_hand(player_best)
-
-            # Generate opponents and compare
-            player_won = True
-            tie = False
+        # Re-raises send betting_round around again; within a street only the opponent count can change
+        key = (tuple(player.hand), tuple(self.community_cards), num_opponents)
+        if key in self.equity_cache:
+            self.last_estimate = self.equity_cache[key]
+            return self.last_estimate.equity
+
+        if (not self.community_cards and self.preflop_table is not None
+                and 1 <= num_opponents <= MAX_PREFLOP_OPPONENTS):
+            estimate = EquityEstimate(preflop_equity(self.preflop_table, player.hand, num_opponents), 0, 0.0)
+        else:
+            estimate = None
+            if self.disk_cache is not None:
+                estimate = self.disk_cache.get(player.hand, self.community_cards, num_opponents)
+
+            if estimate is None:
+                # Exact on late streets when the deal count is small, otherwise Monte Carlo
+                # with every simulated board and opponent hand scored in one batch call
+                estimate = estimate_equity(player.hand, self.community_cards, num_opponents, simulations,
+                                           self.exact_limit, self.rng, self.best_hand_scores,
+                                           self.target_stderr, self.min_samples, self.max_samples,
+                                           self.equity_pool, self.sampling)
+                if self.disk_cache is not None:
+                    self.disk_cache.put(player.hand, self.community_cards, num_opponents, estimate)
+
+        self.equity_cache[key] = estimate
+        self.last_estimate = estimate
+        return estimate.equity
+
+
+    def estimate_range_win_probability(self, player, opponents, simulations=100):
+        """Equity against the current ranges of the named opponents (not cached: raises change them)."""
+        if not opponents:
+            self.last_estimate = EquityEstimate(1.0, 0, 0.0)
+            return 1.0
+        ranges = [self.player_ranges.get(name) or HandRange() for name in opponents]
+        self.last_estimate = range_equity(player.hand, self.community_cards, ranges, simulations, self.rng,
+                                          self.best_hand_scores)
+        return self.last_estimate.equity
+
+
+    def estimate_table_win_probabilities(self, names, num_opponents):
+        """Caches every seat's equity for the street from one shared set of runouts.
+
+        The runouts come from the hand's EquitySession, so the turn and river
+        mostly reuse what was simulated on the flop. With parallel=True, big
+        top-ups are scored on the EquityPool's workers.
+        """
+        board = self.community_cards
+        if count_deals(52 - 2 - len(board), 5 - len(board), num_opponents) <= self.exact_limit:
+            return  # each seat gets an exact answer cheaply anyway
+
+        hands = [self.players[name].hand for name in names]
+        if self.disk_cache is not None:
+            cached = [self.disk_cache.get(hand, board, num_opponents) for hand in hands]
+            if all(cached):
+                for hand, estimate in zip(hands, cached):
+                    self.equity_cache[(tuple(hand), tuple(board), num_opponents)] = estimate
+                return
 
-            for _ in range(num_opponents):
-                opp_hand = [sim_deck.pop(), sim_deck.pop()]
-                opp_best = max(combinations(opp_hand + sim_community, 5), key=self.evaluate_hand)
-                opp_score = self.evaluate_hand(opp_best)
+        # Seats are matched by hand, so a new street's rotated order and any folds still reuse the session
+        session = self.equity_session
+        street = len(board)
+        if session is None or not session.covers(hands, num_opponents):
+            session = EquitySession(hands, num_opponents, max(self.session_simulations, self.simulations),
+                                    self.simulations, self.rng, self.best_hand_scores, self.sampling,
+                                    self.equity_pool)
+            self.equity_session = session
+            self.session_stats[street, "new"] = self.session_stats.get((street, "new"), 0) + 1
+        else:
+            self.session_stats[street, "reused"] = self.session_stats.get((street, "reused"), 0) + 1
+        estimate = session.equity(board, hands, num_opponents)
+        for hand, equity, samples, stderr in zip(hands, estimate.equity.tolist(), estimate.samples.tolist(),
+                                                 estimate.stderr.tolist()):
+            self.equity_cache[(tuple(hand), tuple(board), num_opponents)] = EquityEstimate(equity, samples, stderr)
+            if self.disk_cache is not None:
+                self.disk_cache.put(hand, board, num_opponents, EquityEstimate(equity, samples, stderr))
 
-                if opp_score > player_score:
-                    player_won = False
-                    break
-                elif opp_score == player_score:
-                    tie = True
 
-            if player_won and not tie:
-                wins += 1
-            elif tie:
-                ties += 1
+    def close(self):
+        """Writes out what's still buffered (equity cache, AI checkpoints) and stops the equity workers.
 
-        return (wins + 0.5 * ties) / simulations
+        Call it when done with a game: exit handlers cover the main process, but not
+        multiprocessing workers, which exit without running them.
+        """
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+        if self.equity_pool is not None:
+            self.equity_pool.close()
 
 
     def evaluate_hand(self, cards):
-        """Returns a numerical score for a 5-card hand."""
-        ranks = "23456789TJQKA"
-        rank_values = {r: i for i, r in enumerate(ranks, 2)}
-        
-        # Get rank counts and suit counts
-        values = sorted([rank_values[c[0]] for c in cards], reverse=True)
-        suits = [c[1] for c in cards]
-        unique_vals = sorted(set(values), reverse=True)
-        val_counts = {v: values.count(v) for v in unique_vals}
-
-        is_flush = len(set(suits)) == 1
-        is_straight = len(unique_vals) == 5 and (unique_vals[0] - unique_vals[-1] == 4)
-
-        # Special case: A-2-3-4-5 straight
-        if set(values) == {14, 5, 4, 3, 2}:
-            is_straight = True
-            unique_vals = [5, 4, 3, 2, 1]
-
-        if is_flush and is_straight and max(unique_vals) == 14:
-            return (9, unique_vals)  # Royal Flush
-        elif is_flush and is_straight:
-            return (8, unique_vals)  # Straight Flush
-        elif 4 in val_counts.values():
-            four = [v for v in val_counts if val_counts[v] == 4][0]
-            kicker = max([v for v in unique_vals if v != four])
-            return (7, [four]*4 + [kicker])
-        elif sorted(val_counts.values()) == [2, 3]:
-            three = [v for v in val_counts if val_counts[v] == 3][0]
-            pair = [v for v in val_counts if val_counts[v] == 2][0]
-            return (6, [three]*3 + [pair]*2)
-        elif is_flush:
-            return (5, values)
-        elif is_straight:
-            return (4, unique_vals)
-        elif 3 in val_counts.values():
-            three = [v for v in val_counts if val_counts[v] == 3][0]
-            kickers = [v for v in unique_vals if v != three]
-            return (3, [three]*3 + kickers)
-        elif list(val_counts.values()).count(2) == 2:
-            pairs = sorted([v for v in val_counts if val_counts[v] == 2], reverse=True)
-            kicker = [v for v in unique_vals if v not in pairs][0]
-            return (2, pairs*2 + [kicker])
-        elif 2 in val_counts.values():
-            pair = [v for v in val_counts if val_counts[v] == 2][0]
-            kickers = [v for v in unique_vals if v != pair]
-            return (1, [pair]*2 + kickers)
-        else:
-            return (0, values)  # High card
-        
+        """Returns a numerical score for a 5-card hand (decode with PokerEval.describe_score)."""
+        return evaluate_hand(cards)
+
 
     def showdown(self):
         if len(self.players) == 1:
-            winner = list(self.players.keys())[0]
+            payouts = {list(self.players.keys())[0]: self.pot}
         else:
-            best_scores = {}
-            for name, player in self.players.items():
-                if hasattr(self, 'folded_players') and name in self.folded_players:
-                    continue  # Skip folded players
+            live = [name for name in self.players
+                    if not (hasattr(self, 'folded_players') and name in self.folded_players)]  # Skip folded players
 
-                all_cards = player.hand + self.community_cards
-                best_five = max(combinations(all_cards, 5), key=self.evaluate_hand)
-                best_scores[name] = self.evaluate_hand(best_five)
-
-            if not best_scores:
+            if not live:
                 #print("No players to show down — all folded?")
                 return
 
-            winner = max(best_scores, key=best_scores.get)
+            # Hand states have tracked every live hand through the board already, so
+            # this is one pass over the scores; tied hands split the pot
+            result = split_pot([self.hand_states[name].score() for name in live], self.pot)
+            payouts = {live[i]: result.payouts[i] for i in result.winners}
 
-        #print(f"\nWinner: {winner} wins the pot of {self.pot} chips!")
-        self.players[winner].balance += self.pot
+        #print(f"\nWinners: {payouts} from a pot of {self.pot} chips")
+        for name, amount in payouts.items():
+            self.players[name].balance += amount
 
         for name, player in self.all_players.items():
             if not self.is_ai(name):
@@ -701,7 +760,11 @@ class PokerGame:
                 #print(reward)
 
             player.update_q_value(reward)
-            player.save_ai_state()
+            if self.checkpoints:
+                self.checkpoints.mark(player)
+
+        if self.checkpoints:
+            self.checkpoints.hand_done()
 
 
 
@@ -754,13 +817,14 @@ class PokerGame:
             if name in self.all_players:
                 ai = self.all_players[name]
             else:
-                ai = PokerAI(name=name, save_file=f"{name}.json", load=False)
+                ai = PokerAI(name=name, save_file=f"{name}.ckpt", load=False)
                 ai.learning_log = []
                 ai.reset_rounds = []
                 ai.total_resets = 0
 
             # Mutate strategy from winner
             ai.q_table = copy.deepcopy(winner_ai.q_table)
+            ai.visits = {}  # so inherited Q-values don't carry weight when tables are merged
             ai.bluff_chance = min(max(winner_ai.bluff_chance + random.uniform(-0.02, 0.02), 0), 1)
             ai.call_threshold = min(max(winner_ai.call_threshold + random.uniform(-0.05, 0.05), 0), 1)
             ai.raise_threshold = min(max(winner_ai.raise_threshold + random.uniform(-0.05, 0.05), 0), 1)
@@ -785,7 +849,8 @@ class PokerGame:
 
 
             # Save and register
-            ai.save_ai_state()
+            if self.checkpoints:
+                self.checkpoints.mark(ai)
             self.players[name] = ai
             self.all_players[name] = ai
 
@@ -798,13 +863,17 @@ class PokerGame:
             self.all_players[name] = bot
 
         # Reset game state
-        self.deck = create_deck()
+        self.deck = BitDeck()
         self.community_cards = []
         self.pot = 0
         self.folded_players = set()
         self.first_better = 0
         self.reset_game()
 
+        # Generation boundary: save the new generation now rather than at the next save point
+        if self.checkpoints:
+            self.checkpoints.save()
+
     def reset_all_ais_from_parents(self, parent1, parent2):
         import copy
 
@@ -816,12 +885,13 @@ class PokerGame:
             if name in self.all_players:
                 ai = self.all_players[name]
             else:
-                ai = PokerAI(name=name, save_file=f"{name}.json", load=False)
+                ai = PokerAI(name=name, save_file=f"{name}.ckpt", load=False)
                 ai.learning_log = []
                 ai.reset_rounds = []
                 ai.total_resets = 0
 
             ai.q_table = copy.deepcopy(combined_q)
+            ai.visits = {}
 
             # Combine traits
             def blend(a, b, spread=0.05):
@@ -846,7 +916,8 @@ class PokerGame:
             ai.all_in = False
             ai.total_resets = getattr(ai, "total_resets", 0) + 1
             ai.reset_rounds.append(len(ai.learning_log))
-            ai.save_ai_state()
+            if self.checkpoints:
+                self.checkpoints.mark(ai)
 
             self.players[name] = ai
             self.all_players[name] = ai
@@ -859,12 +930,15 @@ class PokerGame:
             self.players[name] = bot
             self.all_players[name] = bot
 
-        self.deck = create_deck()
+        self.deck = BitDeck()
         self.community_cards = []
         self.pot = 0
         self.folded_players = set()
         self.first_better = 0
 
+        if self.checkpoints:
+            self.checkpoints.save()
+
 
 
 
@@ -918,6 +992,10 @@ def plot_all_ai_learning_progress(ai_players):
 
 
 def combine_q_tables(q1, q2):
+    if isinstance(q1, QTable) and isinstance(q2, QTable):
+        # Unseen states are all zeros, which is what the dict version counts a missing state as
+        return QTable((q1.values + q2.values) / 2, q1.seen | q2.seen)
+
     combined = {}
     for state in set(q1.keys()) | set(q2.keys()):
         a1 = q1.get(state, {})
@@ -931,10 +1009,75 @@ def combine_q_tables(q1, q2):
             combined[state][action] = (qval1 + qval2) / 2
     return combined
 
+def apply_q_update(q_table, visits, state, action, reward, learning_rate=0.1, discount_factor=0.9):
+    """One Q-learning update of q_table[state][action], counted in visits."""
+    counts = visits.setdefault(state, {})
+    counts[action] = counts.get(action, 0) + 1
+    if isinstance(q_table, QTable):
+        return q_table.update(state, action, reward, learning_rate, discount_factor)
+
+    if state not in q_table:
+        q_table[state] = {a: 0.0 for a in ["fold", "call", "raise", "bluff"]}
+
+    current_q = q_table[state].get(action, 0.0)
+    max_future_q = max(q_table[state].values(), default=0.0)
+
+    # Q-learning update
+    new_q = ((1 - learning_rate) * current_q +
+            learning_rate * (reward + discount_factor * max_future_q))
+
+    q_table[state][action] = new_q
+
+    #print(f"Updated Q-value for {state} {action}: {current_q:.3f} → {new_q:.3f} (reward {reward})")
+    return new_q
+
+#-----------------------------------------------------------------------------------------------------------------
+
+def play_training_round(game):
+    """Plays one training hand, first starting a new generation if only one or two AIs have chips left.
+
+    Returns True when a new generation was started.
+    """
+    game.reset_game()
+
+    # Only count AIs that are still in all_players and have chips
+    active_ais = [
+        name for name, player in game.all_players.items()
+        if game.is_ai(name) and player.balance > game.ante_amount
+    ]
+
+    new_generation = False
+    if len(active_ais) == 2:
+        # This is now a legit generation end
+        parent1_name = active_ais[0]
+        parent2_name = active_ais[0]
+        parent1 = game.players[parent1_name]
+        parent2 = game.players[parent2_name]
+        #print(f"\n{parent1_name} is parent 1")
+        #print(f"\n{parent2_name} is parent 2")
+
+        # Evolve a new generation from the winner
+        game.reset_all_ais_from_parents(parent1, parent2)
+        new_generation = True
+
+    elif len(active_ais) == 1:
+        # This is now a legit generation end
+        winner_name = active_ais[0]
+        winner = game.players[winner_name]
+        #print(f"\n{winner_name} is the last AI standing!")
+
+        # Evolve a new generation from the winner
+        game.reset_all_ais_from_winner(winner)
+        new_generation = True
+
+    game.folded_players = set()
+    game.play_round()
+    return new_generation
+
 #-----------------------------------------------------------------------------------------------------------------
 
 if __name__ == "__main__":
-    game = PokerGame(num_ai=5, num_bots=1)
+    game = PokerGame(num_ai=5, num_bots=1, cache_path=DEFAULT_CACHE_PATH)
 
     total_rounds = 2000
     generation = 0
@@ -942,80 +1085,15 @@ if __name__ == "__main__":
     
     for i in range(total_rounds):
         #print(f"\n=== Round {i+1} ===")
-        game.reset_game()
-        #print("\nAIs after reset:")
-        #for name, player in game.players.items():
-            #print(f"{name}: balance={player.balance}")
         elapsed_time = time.time() - start_time
         avg_time_per_round = elapsed_time / (i + 1)
         game_eta = avg_time_per_round * (total_rounds - (i + 1))
 
         print_progress_bar(i, total_rounds, elapsed=elapsed_time, eta=game_eta)
-        
-        # Only count AIs that are still in all_players and have chips
-        active_ais = [
-            name for name, player in game.all_players.items()
-            if game.is_ai(name) and player.balance > game.ante_amount
-        ]
-
-        if len(active_ais) == 2:
-            # This is now a legit generation end
-            parent1 = active_ais[0]
-            parent2 = active_ais[1]
-
-            # Trigger generation reset here
-
-            parent1_name = active_ais[0]
-            parent2_name = active_ais[0]
-            parent1 = game.players[parent1_name]
-            parent2 = game.players[parent2_name]
-            #print(f"\n{parent1_name} is parent 1")
-            #print(f"\n{parent2_name} is parent 2")
-
-            # Save the winner's state
-            parent1.save_ai_state()
-            parent2.save_ai_state()
-
-            # Evolve a new generation from the winner
-            game.reset_all_ais_from_parents(parent1, parent2)
-            #print("\nNew Generation AIs and Bots (Parents):")
-            #for name in game.players:
-                #print(f"{name}: {game.players[name].balance}")
-
 
+        if play_training_round(game):
             generation += 1
             #print(f"\nStarting Generation {generation}...")
-            #continue
-
-            #continue
-
-        elif len(active_ais) == 1:
-            # This is now a legit generation end
-            winner = active_ais[0]
-
-            # Trigger generation reset here
-
-            winner_name = active_ais[0]
-            winner = game.players[winner_name]
-            #print(f"\n{winner_name} is the last AI standing!")
-
-            # Save the winner's state
-            winner.save_ai_state()
-
-            # Evolve a new generation from the winner
-            game.reset_all_ais_from_winner(winner)
-            #print("\nNew Generation AIs and Bots (Winner):")
-            #for name in game.players:
-                #print(f"{name}: {game.players[name].balance}")
-
-
-            generation += 1
-            #print(f"\nStarting Generation {generation}...")
-            #continue
-    
-        game.folded_players = set()
-
-        game.play_round()
         
 
     game.reset_game()
@@ -1030,5 +1108,12 @@ if __name__ == "__main__":
             print(f"Final Balance: {player.balance}")
             print(f"Q-table size: {len(player.q_table)}")
             #print(f"Resets: {getattr(player, 'total_resets', 0)}")
+
+    if game.disk_cache is not None:
+        print(f"\nEquity cache: {game.disk_cache.stats()}")
+
+    game.close()
+    print(f"Checkpoints: {game.checkpoints.snapshots} snapshots, {game.checkpoints.writes} files written")
+
     ai_players = [p for p in game.all_players.values() if isinstance(p, PokerAI)]
     plot_all_ai_learning_progress(ai_players)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import random
+
+
+
+# Define card ranks and suits
+RANKS = "23456789TJQKA"
+SUITS = "♠♥♦♣"
+
+# Letter aliases so "AH KS" style input works the same as "A♥ K♠"
+SUIT_ALIASES = {"S": 0, "H": 1, "D": 2, "C": 3}
+
+# A card is a single int 0..51: card = rank_index * 4 + suit_index
+#   rank = card >> 2  (0 = "2" ... 12 = "A")
+#   suit = card & 3   (index into SUITS)
+DECK = tuple(range(52))
+
+
+def make_card(rank_index, suit_index):
+    return (rank_index << 2) | suit_index
+
+def card_rank(card):
+    return card >> 2
+
+def card_suit(card):
+    return card & 3
+
+
+def create_deck():
+    """Creates a shuffled deck of 52 cards."""
+    deck = list(DECK)
+    random.shuffle(deck)  # Shuffle the deck randomly
+    return deck
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Bitmask deck: bit n set = card n still in the deck
+
+
+FULL_DECK_MASK = (1 << 52) - 1
+
+
+class BitDeck:
+    """A deck held as one 52-bit int, so removing a card or counting is O(1)."""
+
+    def __init__(self, mask=FULL_DECK_MASK, rng=None):
+        self.mask = mask
+        self.rng = rng or random
+
+    @classmethod
+    def without(cls, cards, rng=None):
+        """A full deck minus the given cards."""
+        deck = cls(rng=rng)
+        deck.remove_all(cards)
+        return deck
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __contains__(self, card):
+        return self.mask >> card & 1 == 1
+
+    def __iter__(self):
+        """Cards left, lowest first."""
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def cards(self):
+        return list(self)
+
+    def remove(self, card):
+        self.mask &= ~(1 << card)
+
+    def remove_all(self, cards):
+        for c in cards:
+            self.mask &= ~(1 << c)
+
+    def add(self, card):
+        self.mask |= 1 << card
+
+    def draw(self):
+        """Removes and returns a random card."""
+        mask = self.mask
+        if not mask:
+            raise IndexError("draw from an empty deck")
+
+        if mask.bit_count() >= 26:
+            # Mostly full: guess card numbers until one is still in the deck (at most 2 tries on average)
+            while True:
+                card = self.rng.randrange(52)
+                if mask >> card & 1:
+                    break
+        else:
+            card = self.rng.choice(self.cards())
+        self.mask = mask & ~(1 << card)
+        return card
+
+    def draw_many(self, n):
+        return [self.draw() for _ in range(n)]
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# String conversion (only used at the display / input edges)
+
+
+def card_to_str(card):
+    """Turns 51 into "A♣"."""
+    return RANKS[card >> 2] + SUITS[card & 3]
+
+def cards_to_str(cards):
+    return " ".join(card_to_str(c) for c in cards)
+
+def str_to_card(text):
+    """Parses "A♠", "AS", "as" or "10S" into an int card."""
+    text = text.strip().upper()
+    rank_text, suit_text = text[:-1], text[-1]
+    if rank_text == "10":
+        rank_text = "T"
+
+    if len(rank_text) != 1 or rank_text not in RANKS:
+        raise ValueError(f"Invalid card rank: {text!r}")
+
+    if suit_text in SUITS:
+        suit = SUITS.index(suit_text)
+    elif suit_text in SUIT_ALIASES:
+        suit = SUIT_ALIASES[suit_text]
+    else:
+        raise ValueError(f"Invalid card suit: {text!r}")
+
+    return make_card(RANKS.index(rank_text), suit)
+
+def parse_cards(card_str):
+    """Parses a space separated string like "AH KS" into a list of int cards."""
+    return [str_to_card(c) for c in card_str.split()]
@@ -0,0 +1,324 @@
+import ast
+import atexit
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from PokerQTable import QTable, ACTIONS, ACTION_INDEX, SHAPE, state_index, index_state
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Binary AI checkpoints
+#
+#   magic "PKCKPT\0\0" | version | header length | JSON header | padding | arrays
+#
+# The JSON header holds the state-space schema (so a file from a different grid or action
+# list is refused instead of silently misread), the AI's balance and hyperparameters, and
+# for every array its dtype, shape and byte offset. The arrays are raw little-endian data
+# at 64-byte aligned offsets:
+#   q_values  (11, 4, 11, 4) float64  - QTable.values
+#   seen      (11, 4, 11)    uint8    - QTable.seen
+#   visits    (11, 4, 11, 4) int64    - PokerAI.visits as a dense array
+# so any of them can be read straight off disk without the rest:
+#   np.memmap(path, dtype=a["dtype"], mode="r", offset=a["offset"], shape=a["shape"])
+#
+# The move history is not saved (it was most of the old AI_n.json files and only the
+# last few actions are ever read).
+
+CHECKPOINT_MAGIC = b"PKCKPT\0\0"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_PREFIX = struct.Struct("<8sII")  # magic, version, header length
+CHECKPOINT_EXT = ".ckpt"
+ALIGN = 64
+
+SCHEMA = {
+    "state": ["win_probability", "betting_stage", "aggression"],
+    "shape": list(SHAPE),
+    "actions": list(ACTIONS),
+    "prob_step": 0.1,
+    "aggression_step": 0.1,
+}
+
+# PokerAI attributes stored in the header
+AI_FIELDS = ("balance", "bluff_chance", "raise_threshold", "call_threshold", "aggressive_threshold",
+             "cautious_threshold", "learning_rate", "discount_factor")
+
+
+def checkpoint_path(path):
+    """AI_1.json -> AI_1.ckpt, anything else gets the extension added."""
+    root, ext = os.path.splitext(path)
+    return root + CHECKPOINT_EXT if ext in (".json", CHECKPOINT_EXT) else path + CHECKPOINT_EXT
+
+
+def visits_to_array(visits):
+    counts = np.zeros(SHAPE, dtype=np.int64)
+    for state, actions in visits.items():
+        try:
+            index = state_index(state)
+        except (KeyError, TypeError, ValueError):
+            continue
+        for action, n in actions.items():
+            if action in ACTION_INDEX:
+                counts[index + (ACTION_INDEX[action],)] = n
+    return counts
+
+
+def array_to_visits(counts):
+    visits = {}
+    for index in zip(*np.nonzero(counts.any(axis=-1))):
+        visits[index_state(index)] = {action: int(n) for action, n in zip(ACTIONS, counts[index]) if n}
+    return visits
+
+
+def _pad(offset):
+    return -offset % ALIGN
+
+
+def write_checkpoint(path, q_table, visits=None, fields=None):
+    """Writes a checkpoint. q_table may be a QTable or an old-style dict, visits a dict or a
+    visits_to_array array, fields a dict of AI_FIELDS."""
+    if not isinstance(q_table, QTable):
+        q_table = QTable.from_dict(q_table)
+    arrays = {
+        "q_values": np.ascontiguousarray(q_table.values, dtype="<f8"),
+        "seen": np.ascontiguousarray(q_table.seen, dtype=np.uint8),
+        "visits": (visits if isinstance(visits, np.ndarray) else visits_to_array(visits or {})).astype("<i8"),
+    }
+
+    # The header lists the byte offsets, and its own length decides where the data starts,
+    # so grow the data start until the header fits in front of it
+    relative, offset = {}, 0
+    for name, array in arrays.items():
+        relative[name] = offset
+        offset += array.nbytes + _pad(array.nbytes)
+    data_start = ALIGN
+    while True:
+        layout = {name: {"dtype": array.dtype.str, "shape": list(array.shape),
+                         "offset": data_start + relative[name]} for name, array in arrays.items()}
+        header = {"version": CHECKPOINT_VERSION, "schema": SCHEMA, "ai": dict(fields or {}), "arrays": layout}
+        text = json.dumps(header).encode()
+        needed = CHECKPOINT_PREFIX.size + len(text)
+        if needed <= data_start:
+            break
+        data_start = needed + _pad(needed)
+
+    # Temp file and rename, so a crash mid-write never leaves a torn checkpoint
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(CHECKPOINT_PREFIX.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(text)))
+            f.write(text)
+            for name, array in arrays.items():
+                f.seek(layout[name]["offset"])
+                f.write(array.tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+Checkpoint = namedtuple("Checkpoint", ["header", "q_table", "visits", "fields"])
+
+
+def read_header(path):
+    """The parsed JSON header. Raises ValueError for anything that isn't a checkpoint this code can read."""
+    with open(path, "rb") as f:
+        prefix = f.read(CHECKPOINT_PREFIX.size)
+        if len(prefix) < CHECKPOINT_PREFIX.size:
+            raise ValueError(f"{path} is not an AI checkpoint")
+        magic, version, length = CHECKPOINT_PREFIX.unpack(prefix)
+        if magic != CHECKPOINT_MAGIC:
+            raise ValueError(f"{path} is not an AI checkpoint")
+        if version != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is checkpoint version {version}, this code reads {CHECKPOINT_VERSION}")
+        header = json.loads(f.read(length))
+
+    schema = header.get("schema", {})
+    if schema.get("shape") != SCHEMA["shape"] or schema.get("actions") != SCHEMA["actions"]:
+        raise ValueError(f"{path} was saved for a different state space: {schema}")
+    return header
+
+
+def read_array(path, header, name, mmap=False):
+    """One array from a checkpoint. With mmap it's a copy-on-write map: writes never reach the file."""
+    entry = header["arrays"][name]
+    dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode="c", offset=entry["offset"], shape=shape)
+    with open(path, "rb") as f:
+        f.seek(entry["offset"])
+        return np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+
+def load_checkpoint(path, mmap=False):
+    """Checkpoint(header, QTable, visits dict, AI fields dict) from a file written by write_checkpoint."""
+    header = read_header(path)
+    q_table = QTable(read_array(path, header, "q_values", mmap), read_array(path, header, "seen").astype(bool))
+    visits = array_to_visits(read_array(path, header, "visits"))
+    return Checkpoint(header, q_table, visits, header.get("ai", {}))
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Batched, asynchronous saving
+#
+# Saving every AI after every hand is thousands of synchronous writes per training run, and
+# each one only replaces the last. CheckpointManager instead marks AIs as changed, and at a
+# save point (every `every_hands` hands, after `every_seconds`, at a generation boundary,
+# on close and at interpreter exit) snapshots each changed AI on the caller's thread, which
+# is a couple of small array copies, and hands the snapshots to a writer thread. A snapshot
+# still waiting to be written is replaced by a newer one for the same file.
+
+
+def snapshot_ai(ai):
+    """(q_table copy, visits array, fields) for write_checkpoint, safe to write from another thread."""
+    return (ai.q_table.copy(), visits_to_array(ai.visits),
+            {name: getattr(ai, name) for name in AI_FIELDS if hasattr(ai, name)})
+
+
+class CheckpointManager:
+    def __init__(self, every_hands=100, every_seconds=30.0):
+        self.every_hands = every_hands
+        self.every_seconds = every_seconds
+        self.dirty = {}     # save_file -> AI changed since its last snapshot
+        self.pending = {}   # save_file -> snapshot waiting for the writer
+        self.hands = 0      # hands since the last save point
+        self.last_save = time.monotonic()
+        self.snapshots = 0
+        self.writes = 0
+        self.error = None   # last write error, raised from flush()
+
+        self.condition = threading.Condition()
+        self.writing = False
+        self.closed = False
+        self.thread = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def mark(self, ai):
+        """Notes that ai changed. Nothing is written until the next save point."""
+        self.dirty[ai.save_file] = ai
+
+    def hand_done(self):
+        """Counts a hand and saves if enough hands or time have gone by."""
+        self.hands += 1
+        if self.hands >= self.every_hands or time.monotonic() - self.last_save >= self.every_seconds:
+            self.save()
+
+    def save(self):
+        """Queues a snapshot of every changed AI for writing and returns straight away."""
+        self.hands = 0
+        self.last_save = time.monotonic()
+        if not self.dirty:
+            return
+        snapshots = {path: snapshot_ai(ai) for path, ai in self.dirty.items()}
+        self.dirty.clear()
+        with self.condition:
+            self.pending.update(snapshots)
+            self.snapshots += len(snapshots)
+            self.condition.notify_all()
+
+    def flush(self):
+        """Saves and waits until everything queued is on disk."""
+        self.save()
+        with self.condition:
+            while not self.condition.wait_for(lambda: not self.pending and not self.writing, timeout=1.0):
+                if not self.thread.is_alive():
+                    raise RuntimeError("The checkpoint writer thread has stopped")
+            error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify_all()
+            self.thread.join()
+            atexit.unregister(self.close)
+
+    def _write_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.closed)
+                if not self.pending:
+                    return
+                batch, self.pending = self.pending, {}
+                self.writing = True
+
+            # Whatever goes wrong, flush() and close() (run at exit too) must not wait forever
+            try:
+                for path, (q_table, visits, fields) in batch.items():
+                    try:
+                        write_checkpoint(path, q_table, visits, fields)
+                        self.writes += 1
+                    except Exception as e:
+                        self.error = e
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Old AI_n.json saves
+#
+# Those stored Q-table keys as str(tuple), e.g. "(0.6, 1, 0.2)". ast.literal_eval reads them
+# back without running anything, where the old loader used eval().
+
+
+def _parse_state_keys(raw):
+    table = {}
+    for key, value in raw.items():
+        try:
+            state = ast.literal_eval(key)
+        except (ValueError, SyntaxError):
+            continue  # skip corrupted entries
+        if isinstance(state, tuple):
+            table[state] = value
+    return table
+
+
+def read_json_state(path):
+    """(q_table dict, visits dict, AI fields) from an old JSON save. The history is dropped."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    fields = {name: data[name] for name in AI_FIELDS if name in data}
+    return _parse_state_keys(data.get("q_table", {})), _parse_state_keys(data.get("visits", {})), fields
+
+
+def convert_json(path, out_path=None):
+    """Writes an old JSON save as a checkpoint (AI_1.json -> AI_1.ckpt). Returns the new path."""
+    q_table, visits, fields = read_json_state(path)
+    out_path = out_path or checkpoint_path(path)
+    write_checkpoint(out_path, q_table, visits, fields)
+    return out_path
+
+
+if __name__ == "__main__":
+    # python PokerCheckpoint.py                  converts AI_1.json ... AI_5.json next to this file
+    # python PokerCheckpoint.py a.json b.json    converts those
+    # python PokerCheckpoint.py AI_1.ckpt        prints a checkpoint's header
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = sys.argv[1:] or [os.path.join(here, f"AI_{i}.json") for i in range(1, 6)]
+    for path in paths:
+        if path.endswith(CHECKPOINT_EXT):
+            header = read_header(path)
+            print(f"{path}: version {header['version']}, {int(read_array(path, header, 'seen').sum())} states")
+            print(f"  {header['ai']}")
+        elif os.path.exists(path):
+            out_path = convert_json(path)
+            print(f"{path} ({os.path.getsize(path)} bytes) -> {out_path} ({os.path.getsize(out_path)} bytes)")
+        else:
+            print(f"{path}: not found")
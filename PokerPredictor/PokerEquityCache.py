@@ -0,0 +1,143 @@
+import atexit
+import os
+import sqlite3
+from collections import OrderedDict
+from itertools import permutations
+
+from PokerEquity import EquityEstimate
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Suit isomorphism
+#
+# Equity doesn't change if the suits are relabelled (A♠K♠ on Q♠J♥2♦ is the same spot as
+# A♥K♥ on Q♥J♣2♠), and it doesn't care about the order of the hole cards or the board.
+# The canonical form is the smallest (hand, board) over all 24 suit relabellings, with
+# both parts sorted, so every isomorphic spot ends up with the same key.
+
+SUIT_PERMUTATIONS = [[(c & ~3) | perm[c & 3] for c in range(52)] for perm in permutations(range(4))]
+
+
+def canonicalize(hand, board):
+    """Canonical (hand, board) tuples of int cards for a spot."""
+    best = None
+    for perm in SUIT_PERMUTATIONS:
+        key = (tuple(sorted(perm[c] for c in hand)), tuple(sorted(perm[c] for c in board)))
+        if best is None or key < best:
+            best = key
+    return best
+
+
+def spot_key(hand, board, num_opponents):
+    """One int for a spot: 6 bits per canonical card (0 = no card), then 4 bits of opponents."""
+    canon_hand, canon_board = canonicalize(hand, board)
+    key = 0
+    for c in canon_hand + canon_board + (-1,) * (5 - len(canon_board)):
+        key = key << 6 | (c + 1)
+    return key << 4 | num_opponents
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# On-disk equity cache: a SQLite table of spot key -> estimate, with an in-memory LRU in front
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "equity_cache.sqlite")
+
+
+class EquityCache:
+    """Equity estimates by canonical spot, kept across runs.
+
+    get() looks in the LRU first and the database second. put() keeps the
+    estimate with the most samples per spot, and new entries are written
+    to disk in batches of `write_batch` (and on flush/close, and at exit if
+    nobody closed the cache).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, capacity=100000, write_batch=500):
+        self.path = path
+        self.capacity = capacity
+        self.write_batch = write_batch
+        self.memory = OrderedDict()  # spot key -> EquityEstimate, most recently used last
+        self.pending = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("CREATE TABLE IF NOT EXISTS equity "
+                        "(spot INTEGER PRIMARY KEY, equity REAL, samples INTEGER, stderr REAL)")
+        self.db.commit()
+        atexit.register(self.close)
+
+    def get(self, hand, board, num_opponents):
+        """Cached EquityEstimate for the spot, or None."""
+        key = spot_key(hand, board, num_opponents)
+        estimate = self.memory.get(key)
+        if estimate is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return estimate
+
+        row = self.db.execute("SELECT equity, samples, stderr FROM equity WHERE spot = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        estimate = EquityEstimate(*row)
+        self._remember(key, estimate)
+        self.hits += 1
+        self.disk_hits += 1
+        return estimate
+
+    def put(self, hand, board, num_opponents, estimate):
+        key = spot_key(hand, board, num_opponents)
+        old = self.memory.get(key)
+        if old is not None and old.samples >= estimate.samples:
+            return
+        estimate = EquityEstimate(float(estimate.equity), int(estimate.samples), float(estimate.stderr))
+        self._remember(key, estimate)
+        self.pending[key] = estimate
+        if len(self.pending) >= self.write_batch:
+            self.flush()
+
+    def _remember(self, key, estimate):
+        self.memory[key] = estimate
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def flush(self):
+        """Writes pending entries, keeping whichever of old and new has more samples."""
+        if not self.pending:
+            return
+        self.db.executemany(
+            "INSERT INTO equity VALUES (?, ?, ?, ?) ON CONFLICT(spot) DO UPDATE SET "
+            "equity = excluded.equity, samples = excluded.samples, stderr = excluded.stderr "
+            "WHERE excluded.samples > equity.samples",
+            [(key, *estimate) for key, estimate in self.pending.items()])
+        self.db.commit()
+        self.pending.clear()
+
+    def close(self):
+        if self.db is None:
+            return
+        self.flush()
+        self.db.close()
+        self.db = None
+        atexit.unregister(self.close)
+
+    def stats(self):
+        """Lookup counts and hit rate since this cache was opened."""
+        lookups = self.hits + self.misses
+        return {
+            "lookups": lookups,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "in_memory": len(self.memory),
+        }
+
+    def __len__(self):
+        self.flush()
+        return self.db.execute("SELECT COUNT(*) FROM equity").fetchone()[0]
@@ -0,0 +1,375 @@
+import importlib.util
+from collections import namedtuple
+
+import numpy as np
+
+from PokerCards import RANKS
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Hand evaluation on int cards (see PokerCards for the encoding)
+
+
+def evaluate_hand(cards):
+    """Returns a numerical score for a 5-card hand."""
+    return pack_score(_rank_five(cards))
+
+
+def _rank_five(cards):
+    """Scores a 5-card hand as (category, kickers). Reference for the faster evaluators."""
+    # Rank values go 2..14 so scores read the same as the old "A♠" based ones
+    values = sorted([(c >> 2) + 2 for c in cards], reverse=True)
+    unique_vals = sorted(set(values), reverse=True)
+    val_counts = {v: values.count(v) for v in unique_vals}
+
+    is_flush = len({c & 3 for c in cards}) == 1
+    is_straight = len(unique_vals) == 5 and (unique_vals[0] - unique_vals[-1] == 4)
+
+    # Special case: A-2-3-4-5 straight
+    if set(values) == {14, 5, 4, 3, 2}:
+        is_straight = True
+        unique_vals = [5, 4, 3, 2, 1]
+
+    if is_flush and is_straight and max(unique_vals) == 14:
+        return (9, unique_vals)  # Royal Flush
+    elif is_flush and is_straight:
+        return (8, unique_vals)  # Straight Flush
+    elif 4 in val_counts.values():
+        four = [v for v in val_counts if val_counts[v] == 4][0]
+        kicker = max([v for v in unique_vals if v != four])
+        return (7, [four]*4 + [kicker])
+    elif sorted(val_counts.values()) == [2, 3]:
+        three = [v for v in val_counts if val_counts[v] == 3][0]
+        pair = [v for v in val_counts if val_counts[v] == 2][0]
+        return (6, [three]*3 + [pair]*2)
+    elif is_flush:
+        return (5, values)
+    elif is_straight:
+        return (4, unique_vals)
+    elif 3 in val_counts.values():
+        three = [v for v in val_counts if val_counts[v] == 3][0]
+        kickers = [v for v in unique_vals if v != three]
+        return (3, [three]*3 + kickers)
+    elif list(val_counts.values()).count(2) == 2:
+        pairs = sorted([v for v in val_counts if val_counts[v] == 2], reverse=True)
+        kicker = [v for v in unique_vals if v not in pairs][0]
+        return (2, pairs*2 + [kicker])
+    elif 2 in val_counts.values():
+        pair = [v for v in val_counts if val_counts[v] == 2][0]
+        kickers = [v for v in unique_vals if v != pair]
+        return (1, [pair]*2 + kickers)
+    else:
+        return (0, values)  # High card
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Scores are one int: category << 20 followed by five 4-bit kicker values,
+# so higher is better, ties compare equal and they work as NumPy int arrays
+
+
+HAND_NAMES = ["High Card", "One Pair", "Two Pair", "Three of a Kind", "Straight",
+              "Flush", "Full House", "Four of a Kind", "Straight Flush", "Royal Flush"]
+
+
+def pack_score(score):
+    """Packs a (category, kickers) score into one int with the same ordering."""
+    category, values = score
+    packed = category
+    for v in values:
+        packed = packed << 4 | v
+    return packed
+
+def decode_score(score):
+    """Turns a packed score back into (category, kickers)."""
+    return (score >> 20, [(score >> shift) & 15 for shift in (16, 12, 8, 4, 0)])
+
+def describe_score(score):
+    """Readable form of a packed score, e.g. "Full House (K K K 7 7)"."""
+    category, values = decode_score(score)
+    return f"{HAND_NAMES[category]} ({' '.join(RANKS[v - 2] if v > 1 else 'A' for v in values)})"
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Best hand out of 5-7 cards in one pass (same scores as max over every 5-card subset)
+
+
+def _straight_high(mask):
+    """Rank value of the highest straight in a 13-bit rank mask (5 for the wheel), or 0."""
+    for low in range(8, -1, -1):
+        run = 0b11111 << low
+        if mask & run == run:
+            return low + 6
+    if mask & 0b1000000001111 == 0b1000000001111:  # A-2-3-4-5
+        return 5
+    return 0
+
+def _top_values(mask, k):
+    """Packs the k highest rank values in a mask into the low k nibbles."""
+    packed = 0
+    for v in MASK_VALUES[mask][:k]:
+        packed = packed << 4 | v
+    return packed
+
+def _flush_score(mask):
+    if len(MASK_VALUES[mask]) < 5:
+        return 0
+    high = STRAIGHT_HIGH[mask]
+    if high == 14:
+        return 9 << 20 | STRAIGHT_KICKERS[high]  # Royal Flush
+    elif high:
+        return 8 << 20 | STRAIGHT_KICKERS[high]  # Straight Flush
+    return 5 << 20 | TOP_VALUES[5][mask]
+
+
+# Lookups over every 13-bit rank mask so the evaluator never sorts or builds lists
+STRAIGHT_HIGH = [_straight_high(mask) for mask in range(1 << 13)]
+MASK_VALUES = [[r + 2 for r in range(12, -1, -1) if mask >> r & 1] for mask in range(1 << 13)]
+HIGH_RANK = [len(MASK_VALUES[mask]) and MASK_VALUES[mask][0] - 2 for mask in range(1 << 13)]
+TOP_VALUES = [None] + [[_top_values(mask, k) for mask in range(1 << 13)] for k in range(1, 6)]
+STRAIGHT_KICKERS = [0] * 15
+for _high in range(6, 15):
+    STRAIGHT_KICKERS[_high] = pack_score((0, range(_high, _high - 5, -1)))
+STRAIGHT_KICKERS[5] = pack_score((0, [5, 4, 3, 2, 1]))
+FLUSH_SCORE = [_flush_score(mask) for mask in range(1 << 13)]
+
+
+def evaluate_best_hand(cards):
+    """Returns the score of the best 5-card hand in 5-7 cards."""
+    counts = [0] * 13
+    suit_masks = [0, 0, 0, 0]
+    for c in cards:
+        r = c >> 2
+        counts[r] += 1
+        suit_masks[c & 3] |= 1 << r
+    return score_counts(counts, suit_masks)
+
+
+def score_counts(counts, suit_masks):
+    """Scores a hand from its rank counts and per-suit rank masks."""
+    # by_count[n] = mask of the ranks held exactly n times
+    by_count = [0, 0, 0, 0, 0]
+    for r in range(13):
+        by_count[counts[r]] |= 1 << r
+    return score_by_count(by_count, suit_masks)
+
+
+def score_by_count(by_count, suit_masks):
+    """Scores a hand from its by_count rank masks (see score_counts) and per-suit rank masks."""
+    # With 7 or fewer cards a flush rules out quads and full houses
+    for mask in suit_masks:
+        score = FLUSH_SCORE[mask]
+        if score:
+            return score
+
+    _, singles, pairs, trips, quads = by_count
+
+    if quads:
+        q = HIGH_RANK[quads]
+        kicker = HIGH_RANK[(singles | pairs | trips | quads) & ~(1 << q)] + 2
+        return 7 << 20 | (q + 2) * 0x11110 | kicker
+    if trips and (pairs or trips & (trips - 1)):
+        t = HIGH_RANK[trips]
+        p = HIGH_RANK[(trips & ~(1 << t)) | pairs]
+        return 6 << 20 | (t + 2) * 0x11100 | (p + 2) * 0x11
+
+    high = STRAIGHT_HIGH[singles | pairs | trips]
+    if high:
+        return 4 << 20 | STRAIGHT_KICKERS[high]
+    if trips:
+        return 3 << 20 | (HIGH_RANK[trips] + 2) * 0x11100 | TOP_VALUES[2][singles]
+    if pairs & (pairs - 1):
+        p1 = HIGH_RANK[pairs]
+        rest = pairs & ~(1 << p1)
+        p2 = HIGH_RANK[rest]
+        kicker = HIGH_RANK[(rest & ~(1 << p2)) | singles] + 2
+        return 2 << 20 | (p1 + 2) * 0x10100 | (p2 + 2) * 0x1010 | kicker
+    if pairs:
+        return 1 << 20 | (HIGH_RANK[pairs] + 2) * 0x11000 | TOP_VALUES[3][singles]
+    return TOP_VALUES[5][singles]
+
+
+class HandState:
+    """One player's cards as rank and suit masks, updated as each card is dealt.
+
+    add() is O(1) and score() reads the best hand so far without looking
+    at any 5-card combinations (with fewer than 5 cards it scores what's there).
+    """
+
+    __slots__ = ("counts", "by_count", "suit_masks", "suit_counts", "num_cards", "_score")
+
+    def __init__(self, cards=()):
+        self.counts = [0] * 13
+        self.by_count = [(1 << 13) - 1, 0, 0, 0, 0]  # every rank starts out held 0 times
+        self.suit_masks = [0, 0, 0, 0]
+        self.suit_counts = [0, 0, 0, 0]
+        self.num_cards = 0
+        self._score = None
+        for c in cards:
+            self.add(c)
+
+    def add(self, card):
+        r = card >> 2
+        bit = 1 << r
+        n = self.counts[r]
+        self.counts[r] = n + 1
+        self.by_count[n] ^= bit
+        self.by_count[n + 1] |= bit
+        self.suit_masks[card & 3] |= bit
+        self.suit_counts[card & 3] += 1
+        self.num_cards += 1
+        self._score = None
+
+    def add_all(self, cards):
+        for c in cards:
+            self.add(c)
+
+    @property
+    def rank_mask(self):
+        """Ranks held at least once (what straights are read from)."""
+        return self.suit_masks[0] | self.suit_masks[1] | self.suit_masks[2] | self.suit_masks[3]
+
+    def score(self):
+        """Packed score of the best hand in the cards so far, same as evaluate_best_hand."""
+        if self._score is None:
+            self._score = score_by_count(self.by_count, self.suit_masks)
+        return self._score
+
+    def category(self):
+        return self.score() >> 20
+
+    def copy(self):
+        state = HandState.__new__(HandState)
+        state.counts = self.counts[:]
+        state.by_count = self.by_count[:]
+        state.suit_masks = self.suit_masks[:]
+        state.suit_counts = self.suit_counts[:]
+        state.num_cards = self.num_cards
+        state._score = self._score
+        return state
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# NumPy batch evaluation: same scores as evaluate_best_hand for an (N, 5-7) array of hands
+
+
+RANK_BITS_NP = np.array([1 << r for r in range(13)], dtype=np.int64)
+STRAIGHT_HIGH_NP = np.array(STRAIGHT_HIGH, dtype=np.int64)
+STRAIGHT_KICKERS_NP = np.array(STRAIGHT_KICKERS, dtype=np.int64)
+HIGH_RANK_NP = np.array(HIGH_RANK, dtype=np.int64)
+TOP_VALUES_NP = [None] + [np.array(TOP_VALUES[k], dtype=np.int64) for k in range(1, 6)]
+FLUSH_SCORE_NP = np.array(FLUSH_SCORE, dtype=np.int64)
+
+
+def evaluate_batch(cards):
+    """Scores every row of an (N, 5-7) int card array. Returns an (N,) int64 array."""
+    cards = np.asarray(cards)
+    n = len(cards)
+
+    # Rank x suit histogram of each hand, then rank counts and per-suit rank masks from it
+    held = np.zeros((n, 52), dtype=np.int8)
+    held[np.arange(n)[:, None], cards] = 1
+    held = held.reshape(n, 13, 4)
+    counts = held.sum(axis=2)
+    suit_masks = (held * RANK_BITS_NP[None, :, None]).sum(axis=1)
+    flush = FLUSH_SCORE_NP[suit_masks].max(axis=1)
+
+    singles, pairs, trips, quads = [((counts == k) * RANK_BITS_NP).sum(axis=1) for k in range(1, 5)]
+    present = singles | pairs | trips
+
+    # Score every hand as each category it could be, then keep the best category that applies
+    q = HIGH_RANK_NP[quads]
+    quad_score = 7 << 20 | (q + 2) * 0x11110 | HIGH_RANK_NP[(present | quads) & ~(1 << q)] + 2
+
+    t = HIGH_RANK_NP[trips]
+    other_trips = trips & ~(1 << t)
+    full_house = 6 << 20 | (t + 2) * 0x11100 | (HIGH_RANK_NP[other_trips | pairs] + 2) * 0x11
+    straight_high = STRAIGHT_HIGH_NP[present]
+    straight = 4 << 20 | STRAIGHT_KICKERS_NP[straight_high]
+    three = 3 << 20 | (t + 2) * 0x11100 | TOP_VALUES_NP[2][singles]
+
+    p1 = HIGH_RANK_NP[pairs]
+    rest = pairs & ~(1 << p1)
+    p2 = HIGH_RANK_NP[rest]
+    two_pair = (2 << 20 | (p1 + 2) * 0x10100 | (p2 + 2) * 0x1010
+                | HIGH_RANK_NP[(rest & ~(1 << p2)) | singles] + 2)
+    one_pair = 1 << 20 | (p1 + 2) * 0x11000 | TOP_VALUES_NP[3][singles]
+
+    return np.select(
+        [flush > 0, quads > 0, (trips > 0) & ((pairs > 0) | (other_trips > 0)),
+         straight_high > 0, trips > 0, rest > 0, pairs > 0],
+        [flush, quad_score, full_house, straight, three, two_pair, one_pair],
+        default=TOP_VALUES_NP[5][singles],
+    )
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Showdowns
+
+
+ShowdownResult = namedtuple("ShowdownResult", ["scores", "winners", "payouts"])
+
+
+def split_pot(scores, pot):
+    """Splits pot between the best scores: a ShowdownResult of the scores, the winning
+    indices and every hand's payout. Odd chips go to the first winners in order."""
+    scores = [int(score) for score in scores]
+    best = max(scores)
+    winners = [i for i, score in enumerate(scores) if score == best]
+    share, odd = divmod(pot, len(winners))
+    payouts = [0] * len(scores)
+    for n, i in enumerate(winners):
+        payouts[i] = share + (1 if n < odd else 0)
+    return ShowdownResult(scores, winners, payouts)
+
+
+def resolve_showdown(hands, board, pot, evaluate=evaluate_batch):
+    """Scores every two-card hand on the board in one batch call, then splits the pot (see split_pot)."""
+    return split_pot(evaluate([list(hand) + list(board) for hand in hands]).tolist(), pot)
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Backend selection
+
+
+EVALUATOR_BACKENDS = ("python", "lookup", "numba")
+
+# numba is on the training boxes but not everywhere, so "numba" quietly means "python" without it
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+DEFAULT_EVALUATOR = "numba" if HAVE_NUMBA else "python"
+
+# Batch evaluator -> compiled function doing PokerEquity.runout_outcomes in one loop (filled in by PokerJit)
+RUNOUT_KERNELS = {}
+
+
+def get_evaluator(name="python"):
+    """Returns the best-hand scoring function for a backend name.
+
+    Every backend returns the same packed int scores as evaluate_hand.
+    """
+    if name == "python":
+        return evaluate_best_hand
+    elif name == "lookup":
+        import PokerLookup  # imports PokerEval itself, so load it lazily
+        return PokerLookup.load_table().evaluate
+    elif name == "numba":
+        if not HAVE_NUMBA:
+            return evaluate_best_hand
+        import PokerJit
+        return PokerJit.evaluate
+    raise ValueError(f"Unknown evaluator backend: {name!r}")
+
+
+def get_batch_evaluator(name="python"):
+    """Like get_evaluator, but for (N, 5-7) card arrays."""
+    if name == "python":
+        return evaluate_batch
+    elif name == "lookup":
+        import PokerLookup
+        return PokerLookup.load_table().evaluate_batch
+    elif name == "numba":
+        if not HAVE_NUMBA:
+            return evaluate_batch
+        import PokerJit
+        return PokerJit.evaluate_batch
+    raise ValueError(f"Unknown evaluator backend: {name!r}")
@@ -1,8 +1,19 @@
 import json
 from Poker2 import PokerAI
+from PokerCards import str_to_card, cards_to_str
 
 def parse_cards(card_str):
-    return card_str.strip().upper().split()
+    """Turns "AH KS" into int cards for the engine. Raises ValueError on a bad card."""
+    return [str_to_card(c) for c in card_str.strip().upper().split()]
+
+def input_cards(prompt):
+    """Asks for cards until they parse."""
+    card_str = input(prompt)
+    while True:
+        try:
+            return parse_cards(card_str)
+        except ValueError as e:
+            card_str = input(f"{e}. Try again: ")
 
 def get_opponent_actions(start, end, num_players):
     actions = []
@@ -13,7 +24,7 @@ def get_opponent_actions(start, end, num_players):
     return actions
 
 def main():
-    ai = PokerAI(name="Trained_AI", save_file="AI_1.json")
+    ai = PokerAI(name="Trained_AI", save_file="AI_1.ckpt")
     ai.load_ai_state()
 
     num_players = int(input("Enter total number of players at the table: "))
@@ -25,7 +36,7 @@ def main():
         current_bets = {f"Player_{i+1}": 0 for i in range(num_players)}
         folded = set()
 
-        ai.hand = parse_cards(input("Enter AI's hole cards (e.g., 'AH KS'): "))
+        ai.hand = input_cards("Enter AI's hole cards (e.g., 'AH KS'): ")
         ai_position = int(input(f"Enter AI's position (1 to {num_players}): ")) - 1
 
         community_cards = []
@@ -84,8 +95,9 @@ def main():
                 ai.history.append(action.split()[0])
 
             if stage < 3:
-                new_cards = parse_cards(input("Enter new community cards: "))
+                new_cards = input_cards("Enter new community cards: ")
                 community_cards.extend(new_cards)
+                print(f"Community Cards: {cards_to_str(community_cards)}")
             else:
                 result = input("Did the AI win the hand? (y/n): ").strip().lower()
                 if result == 'y':
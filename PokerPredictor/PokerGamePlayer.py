@@ -1,16 +1,9 @@
 import random
 from Poker2 import PokerAI, BotPlayer
-
-RANKS = "23456789TJQKA"
-SUITS = "SHDC"
+from PokerCards import create_deck, cards_to_str
 
 STAGES = ["Pre-Flop", "Flop", "Turn", "River"]
 
-def create_deck():
-    deck = [r + s for r in RANKS for s in SUITS]
-    random.shuffle(deck)
-    return deck
-
 def get_player_action(player_name, highest_bet):
     while True:
         action = input(f"{player_name}'s action (fold/call/raise amount): ").strip().lower()
@@ -27,14 +20,14 @@ def get_player_action(player_name, highest_bet):
 def evaluate_hand_strength(hand, community):
     # Dummy evaluation by assigning score from highest card
     all_cards = hand + community
-    return max(RANKS.index(card[0]) for card in all_cards)
+    return max(card >> 2 for card in all_cards)
 
 def play_poker_game(num_ai, num_bots):
     players = []
     total_players = num_ai + num_bots + 1  # Include human player
 
     for i in range(num_ai):
-        players.append(PokerAI(name=f"Player_{i+1}", save_file=f"AI_{i+1}.json"))
+        players.append(PokerAI(name=f"Player_{i+1}", save_file=f"AI_{i+1}.ckpt"))
     for i in range(num_bots):
         players.append(BotPlayer(name=f"Player_{num_ai+i+1}"))
     players.append("HUMAN")
@@ -64,7 +57,7 @@ def play_poker_game(num_ai, num_bots):
         for i, player in enumerate(players):
             name = f"Player_{i+1}"
             if player == "HUMAN":
-                print(f"Your hole cards: {' '.join(hole_cards[name])}")
+                print(f"Your hole cards: {cards_to_str(hole_cards[name])}")
 
         for stage_index, stage in enumerate(STAGES):
             print(f"\n--- {stage} ---")
@@ -75,7 +68,7 @@ def play_poker_game(num_ai, num_bots):
                 community_cards.append(deck.pop())
 
             if stage != "Pre-Flop":
-                print(f"Community Cards: {' '.join(community_cards)}")
+                print(f"Community Cards: {cards_to_str(community_cards)}")
 
             current_bets = {name: 0 for name in balances}
 
@@ -0,0 +1,152 @@
+import numpy as np
+
+from PokerEval import (FLUSH_SCORE_NP, STRAIGHT_HIGH_NP, STRAIGHT_KICKERS_NP, HIGH_RANK_NP, TOP_VALUES_NP,
+                       RUNOUT_KERNELS)
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Stand-in when numba isn't installed: the functions below then run as plain Python."""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# numba backend: the same scores as PokerEval.evaluate_best_hand, compiled.
+#
+# Only PokerEval.get_evaluator("numba") should pick this module, and it falls back to the
+# NumPy evaluator when numba isn't installed (the plain Python versions here are very slow).
+
+FLUSH = FLUSH_SCORE_NP
+STRAIGHT_HIGH = STRAIGHT_HIGH_NP
+STRAIGHT_KICKERS = STRAIGHT_KICKERS_NP
+HIGH_RANK = HIGH_RANK_NP
+TOP2 = TOP_VALUES_NP[2]
+TOP3 = TOP_VALUES_NP[3]
+TOP5 = TOP_VALUES_NP[5]
+
+
+@njit(cache=True)
+def _score_cards(cards, n):
+    """Packed score of the best hand in cards[:n] (5-7 int cards)."""
+    counts = np.zeros(13, np.int64)
+    suit_masks = np.zeros(4, np.int64)
+    for j in range(n):
+        c = cards[j]
+        r = c >> 2
+        counts[r] += 1
+        suit_masks[c & 3] |= 1 << r
+
+    # With 7 or fewer cards a flush rules out quads and full houses
+    for s in range(4):
+        score = FLUSH[suit_masks[s]]
+        if score:
+            return score
+
+    singles = 0
+    pairs = 0
+    trips = 0
+    quads = 0
+    for r in range(13):
+        k = counts[r]
+        if k == 1:
+            singles |= 1 << r
+        elif k == 2:
+            pairs |= 1 << r
+        elif k == 3:
+            trips |= 1 << r
+        elif k == 4:
+            quads |= 1 << r
+
+    if quads:
+        q = HIGH_RANK[quads]
+        kicker = HIGH_RANK[(singles | pairs | trips | quads) & ~(1 << q)] + 2
+        return 7 << 20 | (q + 2) * 0x11110 | kicker
+    if trips and (pairs or trips & (trips - 1)):
+        t = HIGH_RANK[trips]
+        p = HIGH_RANK[(trips & ~(1 << t)) | pairs]
+        return 6 << 20 | (t + 2) * 0x11100 | (p + 2) * 0x11
+
+    high = STRAIGHT_HIGH[singles | pairs | trips]
+    if high:
+        return 4 << 20 | STRAIGHT_KICKERS[high]
+    if trips:
+        return 3 << 20 | (HIGH_RANK[trips] + 2) * 0x11100 | TOP2[singles]
+    if pairs & (pairs - 1):
+        p1 = HIGH_RANK[pairs]
+        rest = pairs & ~(1 << p1)
+        p2 = HIGH_RANK[rest]
+        kicker = HIGH_RANK[(rest & ~(1 << p2)) | singles] + 2
+        return 2 << 20 | (p1 + 2) * 0x10100 | (p2 + 2) * 0x1010 | kicker
+    if pairs:
+        return 1 << 20 | (HIGH_RANK[pairs] + 2) * 0x11000 | TOP3[singles]
+    return TOP5[singles]
+
+
+@njit(cache=True)
+def _score_rows(cards):
+    out = np.empty(cards.shape[0], np.int64)
+    for i in range(cards.shape[0]):
+        out[i] = _score_cards(cards[i], cards.shape[1])
+    return out
+
+
+@njit(cache=True)
+def _runout_outcomes(hand, board, draws, num_opponents):
+    """1 / 0.5 / 0 per runout, like PokerEquity.runout_outcomes, without building the big arrays."""
+    simulations = draws.shape[0]
+    known = board.shape[0]
+    missing = 5 - known
+    out = np.empty(simulations)
+    cards = np.empty(7, np.int64)
+    for j in range(known):
+        cards[2 + j] = board[j]
+
+    for i in range(simulations):
+        for j in range(missing):
+            cards[2 + known + j] = draws[i, j]
+
+        cards[0] = hand[0]
+        cards[1] = hand[1]
+        player = _score_cards(cards, 7)
+
+        best = -1
+        for k in range(num_opponents):
+            cards[0] = draws[i, missing + 2 * k]
+            cards[1] = draws[i, missing + 2 * k + 1]
+            score = _score_cards(cards, 7)
+            if score > best:
+                best = score
+
+        if num_opponents == 0 or player > best:
+            out[i] = 1.0
+        elif player == best:
+            out[i] = 0.5
+        else:
+            out[i] = 0.0
+    return out
+
+
+def evaluate(cards):
+    """Packed score of the best hand in 5-7 int cards."""
+    return int(_score_cards(np.asarray(cards, dtype=np.int64), len(cards)))
+
+
+def evaluate_batch(cards):
+    """Packed scores for every row of an (N, 5-7) int card array."""
+    return _score_rows(np.ascontiguousarray(cards, dtype=np.int64))
+
+
+def runout_outcomes(hand, board, draws, num_opponents):
+    return _runout_outcomes(np.asarray(hand, dtype=np.int64), np.asarray(board, dtype=np.int64),
+                            np.ascontiguousarray(draws, dtype=np.int64), num_opponents)
+
+
+# Lets PokerEquity.runout_outcomes hand whole Monte Carlo batches to the compiled loop
+RUNOUT_KERNELS[evaluate_batch] = runout_outcomes
@@ -0,0 +1,173 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import numpy as np
+
+from PokerEval import evaluate_best_hand, FLUSH_SCORE, MASK_VALUES
+
+
+
+# Lookup table evaluator
+#
+# Suits only matter for flushes, so the table is split in two:
+#   - a state machine over rank multisets (no rank more than 4 times, up to 7 cards).
+#     State 0 is the empty hand and NEXT[state * 13 + rank] moves to the hand with one
+#     more card of that rank. VALUE[state] is the packed non-flush score for 5-7 cards.
+#   - FLUSH[mask] is the packed flush / straight flush score for a 13-bit suit rank mask
+#     with 5-7 bits set (0 otherwise).
+#
+# A 7-card hand is then 7 NEXT reads, a VALUE read and up to 4 FLUSH reads.
+# The table is built once, written next to this file and mmap'd after that, so
+# several training processes on one box share it through the page cache.
+
+LUT_MAGIC = b"PKLUT001"
+LUT_HEADER = struct.Struct("<8sii")  # magic, number of states, flush table size
+DEFAULT_LUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hand_ranks.lut")
+
+MAX_CARDS = 7
+FLUSH_SIZE = 1 << 13
+
+
+def _representative_cards(counts):
+    """Cards with the given rank counts that can never make a flush."""
+    cards = []
+    for r, n in enumerate(counts):
+        for _ in range(n):
+            cards.append((r << 2) | (len(cards) & 3))  # rotate suits: at most 2 per suit for 7 cards
+    return cards
+
+
+def build_table():
+    """Builds the NEXT, VALUE and FLUSH arrays. Takes a few seconds."""
+    empty = (0,) * 13
+    states = {empty: 0}
+    order = [empty]
+
+    # Breadth first, so every hand with n cards comes before every hand with n + 1
+    for counts in order:
+        if sum(counts) == MAX_CARDS:
+            continue
+        for r in range(13):
+            if counts[r] < 4:
+                nxt = counts[:r] + (counts[r] + 1,) + counts[r + 1:]
+                if nxt not in states:
+                    states[nxt] = len(order)
+                    order.append(nxt)
+
+    next_state = array("i", [0]) * (len(order) * 13)
+    value = array("i", [0]) * len(order)
+    for state, counts in enumerate(order):
+        n = sum(counts)
+        if n < MAX_CARDS:
+            for r in range(13):
+                if counts[r] < 4:
+                    next_state[state * 13 + r] = states[counts[:r] + (counts[r] + 1,) + counts[r + 1:]]
+        if n >= 5:
+            value[state] = evaluate_best_hand(_representative_cards(counts))
+
+    flush = array("i", [0]) * FLUSH_SIZE
+    for mask in range(FLUSH_SIZE):
+        if len(MASK_VALUES[mask]) <= MAX_CARDS:
+            flush[mask] = FLUSH_SCORE[mask]
+
+    return next_state, value, flush
+
+
+def write_table(path=DEFAULT_LUT_PATH):
+    next_state, value, flush = build_table()
+
+    # Write to a temp file and rename, so other processes never map a half written table
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(LUT_HEADER.pack(LUT_MAGIC, len(value), len(flush)))
+        f.write(next_state.tobytes())
+        f.write(value.tobytes())
+        f.write(flush.tobytes())
+    os.replace(tmp_path, path)
+
+
+#-----------------------------------------------------------------------------------------------------------------
+
+
+class LookupTable:
+    def __init__(self, path=DEFAULT_LUT_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, num_states, flush_size = LUT_HEADER.unpack_from(self.mm, 0)
+        if magic != LUT_MAGIC or flush_size != FLUSH_SIZE:
+            raise ValueError(f"{path} is not a usable hand rank table")
+
+        view = memoryview(self.mm)
+        offset = LUT_HEADER.size
+        self.next_state = view[offset:offset + num_states * 13 * 4].cast("i")
+        offset += num_states * 13 * 4
+        self.value = view[offset:offset + num_states * 4].cast("i")
+        offset += num_states * 4
+        self.flush = view[offset:offset + flush_size * 4].cast("i")
+        self.num_states = num_states
+
+        # NumPy views over the same mapping for batch lookups
+        self.next_state_np = np.frombuffer(self.next_state, dtype=np.intc)
+        self.value_np = np.frombuffer(self.value, dtype=np.intc)
+        self.flush_np = np.frombuffer(self.flush, dtype=np.intc)
+
+    def evaluate(self, cards):
+        """Packed score of the best hand in 5-7 int cards."""
+        next_state = self.next_state
+        state = 0
+        suit_masks = [0, 0, 0, 0]
+        for c in cards:
+            r = c >> 2
+            state = next_state[state * 13 + r]
+            suit_masks[c & 3] |= 1 << r
+
+        flush = self.flush
+        for mask in suit_masks:
+            score = flush[mask]
+            if score:
+                return score
+        return self.value[state]
+
+    def evaluate_batch(self, cards):
+        """Packed scores for every row of an (N, 5-7) int card array."""
+        cards = np.asarray(cards)
+        ranks = cards >> 2
+        state = np.zeros(len(cards), dtype=np.intp)
+        for j in range(cards.shape[1]):
+            state = self.next_state_np[state * 13 + ranks[:, j]]
+        score = self.value_np[state].astype(np.int64)
+
+        # With 7 or fewer cards a flush always beats the best non-flush hand in them.
+        # OR rather than sum the rank bits: shared-runout rows can repeat a card (they're
+        # thrown away afterwards) and a sum would carry past the 13-bit table
+        bits = 1 << ranks
+        suits = cards & 3
+        for suit in range(4):
+            mask = np.bitwise_or.reduce(np.where(suits == suit, bits, 0), axis=1)
+            score = np.maximum(score, self.flush_np[mask])
+        return score
+
+
+_tables = {}
+
+
+def load_table(path=DEFAULT_LUT_PATH):
+    """Maps the table at path, building it first if it isn't there yet."""
+    if path not in _tables:
+        try:
+            table = LookupTable(path)
+        except (FileNotFoundError, ValueError):
+            print(f"Building hand rank table at {path}...")
+            write_table(path)
+            table = LookupTable(path)
+        _tables[path] = table
+    return _tables[path]
+
+
+if __name__ == "__main__":
+    write_table(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LUT_PATH)
@@ -0,0 +1,160 @@
+import numpy as np
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Dense Q-table
+#
+# PokerAI states are (round(win_probability, 1), betting_stage, round(aggression, 1)), so
+# there are only 11 x 4 x 11 of them with 4 actions each. QTable keeps every Q-value in one
+# (11, 4, 11, 4) float array indexed by ints, plus a flag per state for "has been seen"
+# (the dict version only had keys for states that came up).
+#
+# It still behaves like the old {state: {action: value}} dict where the rest of the code
+# needs it: `state in table`, `table[state][action] = q`, iterating, len() and
+# QTable.from_dict / to_dict for JSON.
+
+ACTIONS = ("fold", "call", "raise", "bluff")
+ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+PROB_BUCKETS = 11
+NUM_STAGES = 4
+AGG_BUCKETS = 11
+SHAPE = (PROB_BUCKETS, NUM_STAGES, AGG_BUCKETS, len(ACTIONS))
+
+
+def state_index(state):
+    """(prob, stage, agg) key -> (i, j, k) array index. Raises KeyError for states off the grid."""
+    prob, stage, agg = state
+    i, k = int(round(prob * 10)), int(round(agg * 10))
+    if not (0 <= i < PROB_BUCKETS and 0 <= stage < NUM_STAGES and 0 <= k < AGG_BUCKETS):
+        raise KeyError(state)
+    return i, int(stage), k
+
+
+def index_state(index):
+    i, j, k = (int(x) for x in index)
+    return (i / 10, j, k / 10)
+
+
+class _ActionRow:
+    """Write-through {action: value} view of one state's row."""
+
+    __slots__ = ("row",)
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getitem__(self, action):
+        return float(self.row[ACTION_INDEX[action]])
+
+    def __setitem__(self, action, value):
+        self.row[ACTION_INDEX[action]] = value
+
+    def get(self, action, default=None):
+        return float(self.row[ACTION_INDEX[action]]) if action in ACTION_INDEX else default
+
+    def __iter__(self):
+        return iter(ACTIONS)
+
+    def __len__(self):
+        return len(ACTIONS)
+
+    def keys(self):
+        return list(ACTIONS)
+
+    def values(self):
+        return self.row.tolist()
+
+    def items(self):
+        return list(zip(ACTIONS, self.row.tolist()))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class QTable:
+    def __init__(self, values=None, seen=None):
+        self.values = np.zeros(SHAPE) if values is None else np.asarray(values, dtype=float)
+        self.seen = np.zeros(SHAPE[:3], dtype=bool) if seen is None else np.asarray(seen, dtype=bool)
+
+    @classmethod
+    def from_dict(cls, q_table):
+        """Builds a table from the old dict form. States off the grid are skipped."""
+        table = cls()
+        for state, actions in q_table.items():
+            try:
+                table[state] = actions
+            except (KeyError, TypeError, ValueError):
+                continue
+        return table
+
+    def to_dict(self):
+        return {state: dict(actions) for state, actions in self.items()}
+
+    # Fast path for PokerAI: ints in, ints out
+
+    def touch(self, index):
+        """Marks a state as seen (what `q_table[state] = zeros` used to do)."""
+        self.seen[index] = True
+
+    def best_action(self, index):
+        """Index into ACTIONS of the best action (first one on ties, like max() over the dict)."""
+        return int(self.values[index].argmax())
+
+    def best_actions(self):
+        """(11, 4, 11) array of the best action index for every state at once."""
+        return self.values.argmax(axis=-1)
+
+    def update(self, state, action, reward, learning_rate=0.1, discount_factor=0.9):
+        """One Q-learning update, the same as the dict version. Returns the new value."""
+        index = state_index(state)
+        self.seen[index] = True
+        row = self.values[index]
+        a = ACTION_INDEX[action]
+        row[a] = (1 - learning_rate) * row[a] + learning_rate * (reward + discount_factor * row.max())
+        return float(row[a])
+
+    # Dict adapter
+
+    def __contains__(self, state):
+        try:
+            return bool(self.seen[state_index(state)])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __getitem__(self, state):
+        index = state_index(state)
+        if not self.seen[index]:
+            raise KeyError(state)
+        return _ActionRow(self.values[index])
+
+    def __setitem__(self, state, actions):
+        index = state_index(state)
+        self.seen[index] = True
+        row = self.values[index]
+        row[:] = 0.0
+        for action, value in actions.items():
+            row[ACTION_INDEX[action]] = value
+
+    def get(self, state, default=None):
+        return self[state] if state in self else default
+
+    def __len__(self):
+        return int(self.seen.sum())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return [index_state(index) for index in zip(*np.nonzero(self.seen))]
+
+    def items(self):
+        """(state, {action: value}) pairs. The dicts are copies, write through table[state] instead."""
+        return [(index_state(index), dict(zip(ACTIONS, self.values[index].tolist())))
+                for index in zip(*np.nonzero(self.seen))]
+
+    def copy(self):
+        return QTable(self.values.copy(), self.seen.copy())
+
+    def __repr__(self):
+        return f"QTable({len(self)} states)"
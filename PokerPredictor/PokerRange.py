@@ -0,0 +1,132 @@
+from itertools import combinations
+
+import numpy as np
+
+from PokerEquity import EquityEstimate, hand_class, class_name, runout_outcomes, _rng
+from PokerEval import evaluate_batch
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Opponent ranges
+#
+# A range is a weight for each of the 1326 two-card combos. The combo tables below are
+# built once, so blocking known cards and sampling from a range are a few array ops.
+
+COMBOS = np.array(list(combinations(range(52), 2)), dtype=np.int64)  # (1326, 2), lower card first
+COMBO_MASKS = (1 << COMBOS[:, 0]) | (1 << COMBOS[:, 1])              # both cards as a 52-bit mask
+COMBO_CLASS = np.array([row * 13 + col for row, col in map(hand_class, COMBOS)])  # flat 13 x 13 grid cell
+COMBO_INDEX = {tuple(hand): i for i, hand in enumerate(COMBOS.tolist())}
+CLASS_INDEX = {class_name(row, col): row * 13 + col for row in range(13) for col in range(13)}
+
+
+def card_mask(cards):
+    mask = 0
+    for c in cards:
+        mask |= 1 << int(c)
+    return mask
+
+
+class HandRange:
+    """Weighted opponent range over the 1326 starting combos (all 1.0 = a random hand)."""
+
+    def __init__(self, weights=None):
+        self.weights = np.ones(len(COMBOS)) if weights is None else np.asarray(weights, dtype=float)
+
+    @classmethod
+    def from_classes(cls, class_weights):
+        """Range from hand class weights: {"AA": 1, "AKs": 0.5} or a 13 x 13 grid (see PokerEquity.hand_class)."""
+        if isinstance(class_weights, dict):
+            grid = np.zeros(169)
+            for name, weight in class_weights.items():
+                grid[CLASS_INDEX[name]] = weight
+        else:
+            grid = np.asarray(class_weights, dtype=float).reshape(169)
+        return cls(grid[COMBO_CLASS])
+
+    @classmethod
+    def from_combos(cls, combos, weights=None):
+        """Range holding only the given two-card hands."""
+        index = [COMBO_INDEX[tuple(sorted(hand))] for hand in combos]
+        range_weights = np.zeros(len(COMBOS))
+        range_weights[index] = 1.0 if weights is None else weights
+        return cls(range_weights)
+
+    @classmethod
+    def top(cls, fraction, preflop_table):
+        """The strongest `fraction` of combos by heads-up preflop equity (PokerEquity.load_preflop_table)."""
+        strength = np.asarray(preflop_table[0]).reshape(169)[COMBO_CLASS]
+        order = np.argsort(-strength, kind="stable")
+        weights = np.zeros(len(COMBOS))
+        weights[order[:max(1, int(round(fraction * len(COMBOS))))]] = 1.0
+        return cls(weights)
+
+    def narrowed(self, other):
+        """This range reweighted by another one, e.g. by HandRange.top(0.3, table) after a raise."""
+        return HandRange(self.weights * other.weights)
+
+    def blocked(self, dead_cards):
+        """Weights with every combo that uses a dead card zeroed."""
+        return np.where(COMBO_MASKS & card_mask(dead_cards), 0.0, self.weights)
+
+    def sample(self, n, dead_cards=(), rng=None):
+        """(n, 2) random combos from the range, none of them using a dead card."""
+        rng = rng or _rng
+        weights = self.blocked(dead_cards)
+        total = weights.sum()
+        if total <= 0:
+            raise ValueError("Range is empty once the dead cards are removed")
+        return COMBOS[rng.choice(len(COMBOS), n, p=weights / total)]
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Equity against ranges
+
+
+MAX_REDRAWS = 50
+
+
+def deal_range_runouts(hand, board, ranges, simulations, rng=None):
+    """Like PokerEquity.deal_runouts, but each opponent's two cards come from their HandRange.
+
+    Opponents are dealt first. Runouts where two opponents' hands collide are
+    redrawn as a whole, so the joint deal matches the range weights exactly.
+    Runouts still colliding after MAX_REDRAWS rounds (ranges that overlap a
+    lot) deal the opponents one at a time instead, each blocked by the hands
+    before it, which raises ValueError when the ranges can't all be dealt.
+    The rest of the board then comes from the cards nobody holds.
+    """
+    rng = rng or _rng
+    dead = list(hand) + list(board)
+    missing = 5 - len(board)
+
+    opponents = np.zeros((simulations, 2 * len(ranges)), dtype=np.int64)
+    redo = np.arange(simulations)
+    for _ in range(MAX_REDRAWS):
+        if not len(redo):
+            break
+        for i, hand_range in enumerate(ranges):
+            opponents[redo, 2 * i:2 * i + 2] = hand_range.sample(len(redo), dead, rng)
+        rows = np.sort(opponents[redo], axis=1)
+        redo = redo[(rows[:, 1:] == rows[:, :-1]).any(axis=1)]
+
+    for row in redo:
+        dealt = list(dead)
+        for i, hand_range in enumerate(ranges):
+            opponents[row, 2 * i:2 * i + 2] = hand_range.sample(1, dealt, rng)[0]
+            dealt += opponents[row, 2 * i:2 * i + 2].tolist()
+
+    # Random sort keys, with every card already out pushed to the end
+    keys = rng.random((simulations, 52))
+    keys[:, dead] = 2.0
+    keys[np.arange(simulations)[:, None], opponents] = 2.0
+    board_cards = np.argpartition(keys, missing, axis=1)[:, :missing]
+    return np.hstack([board_cards, opponents])
+
+
+def range_equity(hand, board, ranges, simulations=100, rng=None, evaluate=evaluate_batch):
+    """Equity of `hand` against one HandRange per opponent. Returns an EquityEstimate."""
+    draws = deal_range_runouts(hand, board, ranges, simulations, rng)
+    outcomes = runout_outcomes(hand, board, draws, len(ranges), evaluate)
+    stderr = float(outcomes.std(ddof=1) / np.sqrt(simulations)) if simulations > 1 else 0.0
+    return EquityEstimate(float(outcomes.mean()), simulations, stderr)
@@ -0,0 +1,357 @@
+import copy
+import multiprocessing as mp
+import os
+import queue
+import random
+import sys
+import time
+
+import numpy as np
+
+from Poker2 import PokerAI, PokerGame, apply_q_update, combine_q_tables, play_training_round, print_progress_bar
+from PokerQTable import QTable
+
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Parallel self-play
+#
+# Every worker process runs its own PokerGame (its own seed, no AI_n.ckpt reads or writes)
+# for `sync_every` hands. At each sync point every AI's Q-table from every table is merged
+# into one, and all AIs at all tables carry on from the merged table.
+
+
+MERGE_MODES = ("visits", "combine")
+
+
+def merge_q_tables(tables, visits=None, mode="visits"):
+    """Merges Q-tables into one.
+
+    "visits"  - each (state, action) is the average of the tables' values weighted by how
+                often each table updated it since the last sync (plain average if none did).
+                A new generation clears an AI's counts along with replacing its table, so
+                values it only inherited from the winner or parents carry no weight.
+    "combine" - plain average like combine_q_tables, for any number of tables: a table
+                missing a state counts as 0 for it.
+    """
+    if mode == "combine":
+        if len(tables) == 2:
+            return combine_q_tables(tables[0], tables[1])
+        merged = {}
+        for state in set().union(*tables):
+            actions = set().union(*(table.get(state, {}) for table in tables))
+            merged[state] = {a: sum(table.get(state, {}).get(a, 0) for table in tables) / len(tables)
+                             for a in actions}
+        return merged
+
+    if mode != "visits":
+        raise ValueError(f"Unknown merge mode: {mode!r}")
+
+    merged = {}
+    for state in set().union(*tables):
+        holders = [(table[state], counts.get(state, {})) for table, counts in zip(tables, visits) if state in table]
+        merged[state] = {}
+        for action in set().union(*(values for values, _ in holders)):
+            weights = [counts.get(action, 0) for _, counts in holders]
+            values = [values.get(action, 0.0) for values, _ in holders]
+            total = sum(weights)
+            if total:
+                merged[state][action] = sum(w * v for w, v in zip(weights, values)) / total
+            else:
+                merged[state][action] = sum(values) / len(values)
+    return merged
+
+
+def add_visits(total, counts):
+    """Adds one visit table into another in place."""
+    for state, actions in counts.items():
+        into = total.setdefault(state, {})
+        for action, n in actions.items():
+            into[action] = into.get(action, 0) + n
+    return total
+
+
+def _table_worker(conn, seed, num_ai, num_bots, game_options):
+    """Runs one table in a worker process, playing hands whenever the trainer asks."""
+    sys.stdout = open(os.devnull, "w")  # the AIs print on load, keep the parent's progress bar clean
+    random.seed(int(seed.generate_state(1)[0]))
+    game = PokerGame(num_ai=num_ai, num_bots=num_bots, load_ai=False, autosave=False, **game_options)
+    game.rng = np.random.default_rng(seed)
+
+    while True:
+        message = conn.recv()
+        if message[0] == "stop":
+            break
+
+        _, rounds, q_table = message
+        for player in game.all_players.values():
+            if isinstance(player, PokerAI):
+                if q_table is not None:
+                    player.q_table = copy.deepcopy(q_table)
+                player.visits = {}
+
+        generations = sum(play_training_round(game) for _ in range(rounds))
+        ais = [player for player in game.all_players.values() if isinstance(player, PokerAI)]
+        conn.send(([ai.q_table for ai in ais], [ai.visits for ai in ais], rounds, generations))
+    game.close()  # worker processes skip exit handlers, so flush e.g. a disk cache from game_options here
+    conn.close()
+
+
+class ParallelTrainer:
+    """Self-play on `workers` tables at once, merging Q-tables every `sync_every` hands per table."""
+
+    def __init__(self, workers=None, num_ai=5, num_bots=1, sync_every=200, merge="visits", seed=None,
+                 game_options=None, q_table=None):
+        if merge not in MERGE_MODES:
+            raise ValueError(f"Unknown merge mode: {merge!r}")
+        self.workers = workers or os.cpu_count() or 1
+        self.num_ai = num_ai
+        self.num_bots = num_bots
+        self.sync_every = sync_every
+        self.merge = merge
+        self.game_options = game_options or {}
+        self.q_table = q_table  # merged table, None until the first sync unless given
+        self.visits = {}        # total visits behind the merged table
+        self.hands = 0
+        self.generations = 0
+
+        self.seeds = np.random.SeedSequence(seed).spawn(self.workers)
+        self.processes = []
+        self.connections = []
+
+    def start(self):
+        if self.processes:
+            return
+        for seed in self.seeds:
+            parent_conn, child_conn = mp.Pipe()
+            process = mp.Process(target=_table_worker, daemon=True,
+                                 args=(child_conn, seed, self.num_ai, self.num_bots, self.game_options))
+            process.start()
+            self.processes.append(process)
+            self.connections.append(parent_conn)
+
+    def sync(self, rounds):
+        """Every table plays `rounds` hands from the current merged table, then the results are merged."""
+        self.start()
+        for conn in self.connections:
+            conn.send(("play", rounds, self.q_table))
+
+        tables, visits = [], []
+        for conn in self.connections:
+            worker_tables, worker_visits, hands, generations = conn.recv()
+            tables += worker_tables
+            visits += worker_visits
+            self.hands += hands
+            self.generations += generations
+
+        self.q_table = merge_q_tables(tables, visits, self.merge)
+        for counts in visits:
+            add_visits(self.visits, counts)
+        return self.q_table
+
+    def train(self, rounds, progress=True):
+        """Plays `rounds` hands on every table. Returns the merged Q-table."""
+        start_time = time.time()
+        done = 0
+        while done < rounds:
+            batch = min(self.sync_every, rounds - done)
+            self.sync(batch)
+            done += batch
+            if progress:
+                elapsed = time.time() - start_time
+                print_progress_bar(done, rounds, elapsed=elapsed, eta=elapsed / done * (rounds - done))
+        if progress:
+            elapsed = time.time() - start_time
+            print(f"{self.hands} hands on {self.workers} tables in {elapsed:.1f}s "
+                  f"({self.hands / elapsed:.0f} hands/s), {len(self.q_table)} states")
+        return self.q_table
+
+    def save(self):
+        """Writes the merged table to every AI_n.ckpt, so Poker2 picks it up next run."""
+        save_q_table(self.q_table, self.visits, self.num_ai)
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass  # that worker already died
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+
+def save_q_table(q_table, visits, num_ai):
+    """Writes one Q-table to AI_1.ckpt ... AI_<num_ai>.ckpt."""
+    for i in range(num_ai):
+        name = f"AI_{i+1}"
+        ai = PokerAI(name, save_file=f"{name}.ckpt", load=False)
+        ai.q_table = copy.deepcopy(q_table or {})
+        ai.visits = copy.deepcopy(visits)
+        ai.save_ai_state()
+
+
+#-----------------------------------------------------------------------------------------------------------------
+# Actor-learner
+#
+# Actor processes play hands with a read-only snapshot of the Q-table and send the
+# (state, action, reward) transitions their AIs would have learned from over one queue.
+# The learner (the parent process) applies them to the only real Q-table in batches and
+# sends every actor a new snapshot each `publish_every` updates. Actors never wait on the
+# learner, so adding actors adds hands without any contention on the table.
+
+
+def _actor_worker(actor_id, seed, rounds, num_ai, num_bots, game_options, transitions, snapshots, send_every):
+    """Plays `rounds` hands, picking up the newest snapshot between hands."""
+    sys.stdout = open(os.devnull, "w")
+    random.seed(int(seed.generate_state(1)[0]))
+    game = PokerGame(num_ai=num_ai, num_bots=num_bots, load_ai=False, autosave=False, **game_options)
+    game.rng = np.random.default_rng(seed)
+
+    pending = []
+    played = generations = 0
+    for i in range(rounds):
+        snapshot = None
+        try:
+            while True:
+                snapshot = snapshots.get_nowait()  # only the latest one matters
+        except queue.Empty:
+            pass
+
+        for player in game.all_players.values():
+            if isinstance(player, PokerAI):
+                if snapshot is not None:
+                    player.q_table = snapshot  # unpickled, so already this actor's own copy
+                player.transitions = pending
+
+        generations += play_training_round(game)
+        played += 1
+        if played == send_every or i == rounds - 1:
+            transitions.put((actor_id, pending, played, generations, i == rounds - 1))
+            pending = []
+            played = generations = 0
+    game.close()
+
+
+class ActorLearnerTrainer:
+    """Many actor tables feeding one learner. See the notes above."""
+
+    def __init__(self, actors=None, num_ai=5, num_bots=1, publish_every=500, send_every=10, seed=None,
+                 game_options=None, q_table=None, learning_rate=0.1, discount_factor=0.9):
+        self.actors = actors or os.cpu_count() or 1
+        self.num_ai = num_ai
+        self.num_bots = num_bots
+        self.publish_every = publish_every
+        self.send_every = send_every
+        self.game_options = game_options or {}
+        self.q_table = QTable.from_dict(q_table or {})  # pickles as two small arrays for the snapshots
+        self.visits = {}
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+
+        self.updates = 0
+        self.snapshots_published = 0
+        self.hands = 0
+        self.generations = 0
+        self.seeds = np.random.SeedSequence(seed).spawn(self.actors)
+
+    def apply(self, batch):
+        """Applies a batch of (state, action, reward) transitions to the learner's table."""
+        for state, action, reward in batch:
+            apply_q_update(self.q_table, self.visits, state, action, reward, self.learning_rate,
+                           self.discount_factor)
+        self.updates += len(batch)
+
+    def train(self, rounds, progress=True):
+        """Every actor plays `rounds` hands. Returns the learned Q-table."""
+        transitions = mp.Queue()
+        snapshot_queues = [mp.Queue() for _ in range(self.actors)]
+        processes = [mp.Process(target=_actor_worker, daemon=True,
+                                args=(i, seed, rounds, self.num_ai, self.num_bots, self.game_options,
+                                      transitions, snapshot_queues[i], self.send_every))
+                     for i, seed in enumerate(self.seeds)]
+        # Copies, so each snapshot is the table as it was when published: the queue's feeder
+        # thread pickles it later, while apply() keeps changing the live table
+        snapshot = self.q_table.copy()
+        for snapshots in snapshot_queues:
+            snapshots.put(snapshot)
+        for process in processes:
+            process.start()
+
+        start_time = time.time()
+        total = rounds * self.actors
+        finished_actors = set()
+        last_publish = self.updates
+        try:
+            while len(finished_actors) < self.actors:
+                try:
+                    actor_id, batch, hands, generations, finished = transitions.get(timeout=5)
+                except queue.Empty:
+                    if any(process.exitcode for process in processes):
+                        raise RuntimeError("An actor process died, see its traceback above")
+                    continue
+                self.apply(batch)
+                self.hands += hands
+                self.generations += generations
+                if finished:
+                    finished_actors.add(actor_id)
+
+                if self.updates - last_publish >= self.publish_every:
+                    snapshot = self.q_table.copy()
+                    for i, snapshots in enumerate(snapshot_queues):
+                        if i not in finished_actors:  # nobody reads those queues any more
+                            snapshots.put(snapshot)
+                    self.snapshots_published += 1
+                    last_publish = self.updates
+
+                if progress:
+                    elapsed = time.time() - start_time
+                    played = min(self.hands, total)
+                    print_progress_bar(played, total, elapsed=elapsed, eta=elapsed / played * (total - played))
+        finally:
+            for process in processes:
+                if len(finished_actors) < self.actors:
+                    process.terminate()  # failed part way, don't wait on actors that may never finish
+                process.join()
+            # An actor can finish with snapshots still unread in its queue; don't let their
+            # feeder threads hold up interpreter exit trying to flush them
+            for snapshots in snapshot_queues:
+                snapshots.cancel_join_thread()
+                snapshots.close()
+
+        if progress:
+            elapsed = time.time() - start_time
+            print(f"{self.hands} hands from {self.actors} actors in {elapsed:.1f}s "
+                  f"({self.hands / elapsed:.0f} hands/s), {self.updates} updates, "
+                  f"{self.snapshots_published} snapshots, {len(self.q_table)} states")
+        return self.q_table
+
+    def save(self):
+        save_q_table(self.q_table, self.visits, self.num_ai)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parallel self-play training for the Poker2 AIs.")
+    parser.add_argument("--mode", choices=("tables", "actor-learner"), default="tables")
+    parser.add_argument("--rounds", type=int, default=2000, help="hands per table")
+    parser.add_argument("--workers", type=int, default=None, help="tables / actors (default: one per core)")
+    parser.add_argument("--sync-every", type=int, default=200, help="tables: hands per table between merges")
+    parser.add_argument("--merge", choices=MERGE_MODES, default="visits")
+    parser.add_argument("--publish-every", type=int, default=500, help="actor-learner: updates per snapshot")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.mode == "actor-learner":
+        trainer = ActorLearnerTrainer(args.workers, publish_every=args.publish_every, seed=args.seed)
+        trainer.train(args.rounds)
+        trainer.save()
+    else:
+        trainer = ParallelTrainer(args.workers, sync_every=args.sync_every, merge=args.merge, seed=args.seed)
+        try:
+            trainer.train(args.rounds)
+            trainer.save()
+        finally:
+            trainer.close()
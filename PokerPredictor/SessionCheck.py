@@ -0,0 +1,86 @@
+import argparse
+import random
+import sys
+
+import numpy as np
+
+from PokerEquity import EquitySession, exact_equity
+from Poker2 import PokerGame
+
+
+
+# Checks that PokerGame carries its EquitySession from the flop to the turn.
+#
+#   python SessionCheck.py               # 100 hands
+#   python SessionCheck.py --hands 500 --seed 3
+#
+# The turn should never start a new session: the seat order rotates and players fold
+# between streets, but the session matches seats by hand. Also checks that a session
+# asked about a subset of its seats, in another order and against fewer opponents,
+# still agrees with exact equity, and that min_samples above simulations works.
+# Exits with status 1 on failure.
+
+
+def check_game(hands, seed):
+    random.seed(seed)
+    game = PokerGame(num_ai=5, num_bots=1, load_ai=False, autosave=False)
+    game.rng = np.random.default_rng(seed)
+    for _ in range(hands):
+        game.reset_game()
+        game.folded_players = set()
+        game.play_round()
+
+    stats = game.session_stats
+    print(f"{hands} hands, sessions by street: {dict(sorted(stats.items()))}")
+    if stats.get((4, "new"), 0) or not stats.get((4, "reused"), 0):
+        print("FAIL: the turn should always reuse the flop's session")
+        sys.exit(1)
+
+
+def check_subset(seed, sigmas=4.0):
+    rng = np.random.default_rng(seed)
+    cards = rng.permutation(52).tolist()
+    hands = [cards[i:i + 2] for i in range(0, 8, 2)]
+    flop, turn = cards[8:11], cards[8:12]
+
+    session = EquitySession(hands, num_opponents=3, simulations=4000, rng=rng)
+    session.equity(flop)
+    subset = [hands[2], hands[0]]
+    estimate = session.equity(turn, subset, num_opponents=1)
+    for hand, equity, stderr in zip(subset, estimate.equity, estimate.stderr):
+        exact = exact_equity(hand, turn, 1)
+        if abs(equity - exact) > sigmas * stderr:
+            print(f"FAIL: subset equity {equity:.4f} +- {stderr:.4f}, exact {exact:.4f}")
+            sys.exit(1)
+    print(f"subset on the turn: {estimate.samples.tolist()} runouts kept, agrees with exact equity")
+
+
+def check_min_samples_above_simulations(seeds=range(10)):
+    """min_samples > simulations used to ask for a negative number of new runouts on a repeat query."""
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        cards = rng.permutation(52).tolist()
+        session = EquitySession([cards[0:2], cards[2:4]], num_opponents=2, simulations=500, min_samples=1000,
+                                rng=rng)
+        for _ in range(2):
+            estimate = session.equity(cards[4:7])
+        if estimate.samples.min() < 1000:
+            print(f"FAIL: seed {seed} kept {estimate.samples.tolist()} runouts, wanted at least 1000")
+            sys.exit(1)
+    print(f"min_samples above simulations: {len(seeds)} seeds ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that equity sessions are reused across streets.")
+    parser.add_argument("--hands", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    check_subset(args.seed)
+    check_min_samples_above_simulations()
+    check_game(args.hands, args.seed)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()